@@ -0,0 +1,124 @@
+import numpy as np
+import os
+
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+def _fold_thresholds(thresholds, mean, scale):
+    """
+    Maps thresholds on scaled features back to raw feature values.
+
+    sklearn tests float32((x - mean) / scale) <= t. That test is monotone in x, so for
+    every split there is a largest raw float64 value c with x <= c giving exactly the same
+    answer. It is found by bisection, starting from the algebraic fold t * scale + mean.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32).astype(np.float64) <= thresholds
+
+    guess = thresholds * scale + mean
+    margin = 1e-3 * (1 + np.abs(guess))
+    lo, hi = guess - margin, guess + margin
+    if not (goes_left(lo).all() and not goes_left(hi).any()):
+        raise ValueError("Split thresholds could not be folded back to raw feature values")
+
+    for _ in range(200):
+        mid = lo + (hi - lo) / 2
+        left = goes_left(mid)
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+        if (np.nextafter(lo, np.inf) >= hi).all():
+            break
+    return lo
+
+class CompiledForest:
+    """
+    A fitted StandardScaler + RandomForest pipeline flattened into NumPy arrays.
+
+    All trees share one node table (feature, raw threshold, children, leaf values), leaves
+    point to themselves and every row walks all trees at once for max_depth steps. Leaf
+    values are summed tree by tree in the same order as sklearn, so predictions are
+    bit-for-bit identical to Pipeline.predict.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features, classes=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.classes = classes
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        scaler, forest = pipeline.steps[0][1], pipeline.steps[-1][1]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)
+        scale = scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)
+        classes = getattr(forest, 'classes_', None)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(offset, offset + n)
+
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.full(n, np.inf)
+            threshold[~is_leaf] = _fold_thresholds(tree.threshold[~is_leaf], mean[feature[~is_leaf]], scale[feature[~is_leaf]])
+
+            if classes is None:
+                value = tree.value[:, 0, 0]
+            else:
+                # Older sklearn stores class counts in the leaves and normalizes at predict time
+                value = tree.value[:, 0, :]
+                totals = value.sum(axis=1, keepdims=True)
+                if not np.allclose(totals[is_leaf], 1):
+                    totals[totals == 0] = 1
+                    value = value / totals
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            values.append(value)
+            roots.append(offset)
+            offset += n
+
+        max_depth = max(estimator.tree_.max_depth for estimator in forest.estimators_)
+        return cls(np.concatenate(features).astype(np.intp), np.concatenate(thresholds),
+                   np.concatenate(lefts).astype(np.intp), np.concatenate(rights).astype(np.intp),
+                   np.concatenate(values), np.array(roots, dtype=np.intp), max_depth, scaler.n_features_in_, classes)
+
+    def save(self, directory, name):
+        """Writes each array to its own .npy file so it can be memory-mapped on load."""
+        for field in ARRAYS:
+            np.save(os.path.join(directory, f"{name}_{field}.npy"), getattr(self, field))
+        if self.classes is not None:
+            np.save(os.path.join(directory, f"{name}_classes.npy"), self.classes)
+        return {'max_depth': int(self.max_depth), 'n_features': int(self.n_features)}
+
+    @classmethod
+    def load(cls, directory, name, meta, mmap_mode='r'):
+        arrays = [np.load(os.path.join(directory, f"{name}_{field}.npy"), mmap_mode=mmap_mode) for field in ARRAYS]
+        classes_path = os.path.join(directory, f"{name}_classes.npy")
+        classes = np.load(classes_path) if os.path.exists(classes_path) else None
+        return cls(*arrays, meta['max_depth'], meta['n_features'], classes)
+
+    def _leaf_values(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def predict(self, X):
+        # cumsum adds trees one after another, matching sklearn's accumulation order
+        totals = np.cumsum(self._leaf_values(X), axis=1)[:, -1] / len(self.roots)
+        if self.classes is None:
+            return totals
+        return self.classes.take(np.argmax(totals, axis=1))
\ No newline at end of file
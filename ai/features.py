@@ -1,28 +1,39 @@
+import numpy as np
 import pandas as pd
 
-def extract_features(sim_env, stations, blocks, train, disaster_mode):
-    """Extracts features for a given train from the simulation environment."""
-    
-    current_time = sim_env.now
-    time_of_day = (current_time // 60) % 24
-    day_of_week = (current_time // (60 * 24)) % 7
+# Column order shared by training, the feature row and every prediction path
+FEATURES = [
+    'time_of_day', 'day_of_week', 'num_trains_at_station_A',
+    'num_trains_at_station_B', 'stop_duration_B', 'train_priority',
+    'downstream_block_free', 'is_disaster_mode'
+]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+def extract_feature_row(sim_env, stations, blocks, train, disaster_mode, out=None):
+    """
+    Writes the features for a train into a preallocated row (no DataFrame).
 
-    num_trains_at_station_A = len(stations['A'].platforms.users)
-    num_trains_at_station_B = len(stations['B'].platforms.users)
-    
-    # This logic generates the two missing features
-    downstream_block_free = 1 if blocks['Block_B_C'].count == 0 else 0
-    train_priority = train.priority
+    The model's stations A and B and block B-C are read relative to the train's route, from
+    the (previous, focus, downstream block) indices in train.anchors: on the default line
+    they are A, B and Block_B_C, elsewhere the stop the train is heading for, the station
+    before it and the block after it (free if there is none).
+    """
+    if out is None:
+        out = np.empty(len(FEATURES))
 
-    feature_dict = {
-        'time_of_day': [time_of_day],
-        'day_of_week': [day_of_week],
-        'num_trains_at_station_A': [num_trains_at_station_A],
-        'num_trains_at_station_B': [num_trains_at_station_B],
-        'stop_duration_B': [train.scheduled_stop_duration_b],
-        'train_priority': [train_priority],
-        'downstream_block_free': [downstream_block_free],
-        'is_disaster_mode': [1 if disaster_mode else 0]
-    }
-    
-    return pd.DataFrame(feature_dict)
\ No newline at end of file
+    previous, focus, downstream = train.anchors
+    current_time = sim_env.now
+    out[0] = (current_time // 60) % 24
+    out[1] = (current_time // (60 * 24)) % 7
+    out[2] = len(stations[previous].platforms.users)
+    out[3] = len(stations[focus].platforms.users)
+    out[4] = train.stop_duration
+    out[5] = train.priority
+    out[6] = 1 if downstream < 0 or blocks[downstream].count == 0 else 0
+    out[7] = 1 if disaster_mode else 0
+    return out
+
+def extract_features(sim_env, stations, blocks, train, disaster_mode):
+    """Extracts features for a given train from the simulation environment."""
+    row = extract_feature_row(sim_env, stations, blocks, train, disaster_mode)
+    return pd.DataFrame([row.astype(np.int64)], columns=FEATURES)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Loading the historical training data.
+
+Only the feature and target columns are read (train_id never reaches a model), with the
+smallest dtypes their values fit, and the CSV is parsed in chunks so a large file never
+holds a second full-width copy in memory. The parsed columns are cached next to the model
+artifacts as one .npy file per column and memory-mapped on later loads, until the CSV's
+size or modification time changes.
+"""
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from ai.features import FEATURES
+
+TARGETS = {'delay': 'delay_minutes', 'platform': 'assigned_platform_B', 'drive_mode': 'optimal_drive_mode'}
+DTYPES = {
+    'time_of_day': np.int8, 'day_of_week': np.int8,
+    'num_trains_at_station_A': np.int16, 'num_trains_at_station_B': np.int16,
+    'stop_duration_B': np.int16, 'train_priority': np.int8,
+    'downstream_block_free': np.int8, 'is_disaster_mode': np.int8,
+    'delay_minutes': np.float32, 'assigned_platform_B': np.int8, 'optimal_drive_mode': np.int8,
+}
+COLUMNS = FEATURES + list(TARGETS.values())
+CHUNK_ROWS = 1_000_000
+
+def read_history(path, offset=0):
+    """Parses the model columns of a historical CSV, from byte `offset` (a row boundary) on."""
+    header = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        chunks = list(pd.read_csv(f, header=0 if offset == 0 else None, names=None if offset == 0 else header,
+                                  usecols=COLUMNS, dtype=DTYPES, chunksize=CHUNK_ROWS))
+    if not chunks:
+        return pd.DataFrame({column: np.empty(0, dtype=DTYPES[column]) for column in COLUMNS})
+    return pd.concat(chunks, ignore_index=True)[COLUMNS] if len(chunks) > 1 else chunks[0][COLUMNS]
+
+def load_history(path, cache_dir=None):
+    """The model columns of a historical CSV, from the columnar cache in `cache_dir` when it is current."""
+    if cache_dir is None:
+        return read_history(path)
+    stat = os.stat(path)
+    directory = os.path.join(cache_dir, f"history-{stat.st_size}-{stat.st_mtime_ns}")
+    if not os.path.exists(os.path.join(directory, 'complete')):
+        df = read_history(path)
+        # Written to a temporary directory first, like the model artifacts
+        tmp_dir = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), df[column].to_numpy())
+        open(os.path.join(tmp_dir, 'complete'), 'w').close()
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True) # Another process cached the same CSV first
+        _remove_stale(cache_dir, directory)
+        return df
+    return pd.DataFrame({column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode='r') for column in COLUMNS}, copy=False)
+
+def _remove_stale(cache_dir, current):
+    """Drops the caches of earlier versions of the CSV."""
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if entry.startswith('history-') and '.tmp-' not in entry and path != current:
+            shutil.rmtree(path, ignore_errors=True)
\ No newline at end of file
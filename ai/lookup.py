@@ -0,0 +1,79 @@
+import numpy as np
+from ai.features import FEATURES
+
+# Values each feature takes in the simulation; occupancy runs from 0 to the table's max_occupancy
+HOURS, DAYS = 24, 7
+STOP_DURATIONS = (0, 5, 10, 15)
+STOP_CODES = {duration: code for code, duration in enumerate(STOP_DURATIONS)}
+
+class DecisionTable:
+    """
+    Every model output precomputed over the discrete feature grid, so a prediction is an
+    array index instead of a forest walk.
+
+    The grid covers hour, day, occupancy at two stations (0..max_occupancy), stop duration,
+    priority and the two flags: 5,376 * (max_occupancy + 1)^2 points. Rows off the grid (a
+    larger occupancy, an unusual stop duration) are scored by the live `manager`. The
+    predict_* methods match AIManager's, so either can be handed to the AIController.
+    """
+
+    def __init__(self, manager, max_occupancy, delay, platform, drive_mode):
+        self.manager = manager
+        self.max_occupancy = max_occupancy
+        self.shape = (HOURS, DAYS, max_occupancy + 1, max_occupancy + 1, len(STOP_DURATIONS), 2, 2, 2)
+        self.delay = delay
+        self.platform = platform # Raw class predictions; clamped to the station's platforms on lookup
+        self.drive_mode = drive_mode
+
+    @staticmethod
+    def grid(max_occupancy):
+        """The feature rows of the grid, in table order."""
+        axes = [np.arange(HOURS), np.arange(DAYS), np.arange(max_occupancy + 1), np.arange(max_occupancy + 1),
+                np.array(STOP_DURATIONS), np.array([1, 2]), np.array([0, 1]), np.array([0, 1])]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        return np.stack([m.ravel() for m in mesh], axis=1).astype(float)
+
+    def _index(self, row):
+        """Flat index of a feature row, or None if it is off the grid."""
+        hour, day, at_a, at_b, stop, priority, free, disaster = row.tolist()
+        stop = STOP_CODES.get(stop)
+        m = self.max_occupancy
+        if stop is None or not (0 <= at_a <= m and 0 <= at_b <= m and priority in (1, 2) and free in (0, 1)
+                                and disaster in (0, 1) and 0 <= hour < HOURS and 0 <= day < DAYS):
+            return None
+        n = m + 1
+        return (((((((int(hour) * DAYS + int(day)) * n + int(at_a)) * n + int(at_b)) * 4 + stop) * 2
+                 + int(priority) - 1) * 2 + int(free)) * 2 + int(disaster))
+
+    def predict_delay(self, features):
+        index = self._index(np.asarray(features, dtype=float).reshape(-1))
+        return self.delay[index] if index is not None else self.manager.predict_delay(features)
+
+    def predict_platform(self, features, n_platforms=None):
+        index = self._index(np.asarray(features, dtype=float).reshape(-1))
+        if index is None:
+            return self.manager.predict_platform(features, n_platforms)
+        return int(max(1, min(self.platform[index], n_platforms or self.manager.n_platforms_b)))
+
+    def predict_drive_mode(self, features):
+        index = self._index(np.asarray(features, dtype=float).reshape(-1))
+        return self.drive_mode[index] if index is not None else self.manager.predict_drive_mode(features)
+
+    def predict_drive_mode_batch(self, features):
+        rows = np.asarray(features, dtype=float).reshape(-1, len(FEATURES))
+        indices = [self._index(row) for row in rows]
+        modes = np.empty(len(rows), dtype=self.drive_mode.dtype)
+        off_grid = [i for i, index in enumerate(indices) if index is None]
+        if off_grid:
+            modes[off_grid] = self.manager.predict_drive_mode_batch(rows[off_grid])
+        on_grid = [i for i, index in enumerate(indices) if index is not None]
+        modes[on_grid] = self.drive_mode[[indices[i] for i in on_grid]]
+        return modes
+
+    def save(self, path):
+        np.savez(path, max_occupancy=self.max_occupancy, delay=self.delay, platform=self.platform, drive_mode=self.drive_mode)
+
+    @classmethod
+    def load(cls, manager, path):
+        with np.load(path) as data:
+            return cls(manager, int(data['max_occupancy']), data['delay'], data['platform'], data['drive_mode'])
\ No newline at end of file
@@ -1,60 +1,371 @@
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler
+import hashlib
+import importlib.metadata
+import json
+import logging
 import os
+import pickle
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ai.features import FEATURES
+from ai.compiled import CompiledForest
+from ai.lookup import DecisionTable
+from ai.history import TARGETS, load_history, read_history
+
+HYPERPARAMS = {'n_estimators': 50, 'random_state': 42}
+MODEL_NAMES = ('delay', 'platform', 'drive_mode')
+ARTIFACT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+def _as_matrix(features):
+    """Accepts a feature DataFrame, a single feature row or a 2-D batch and returns a 2-D array."""
+    if isinstance(features, pd.DataFrame):
+        return features[FEATURES].to_numpy(dtype=float)
+    return np.asarray(features, dtype=float).reshape(-1, len(FEATURES))
+
+def _new_pipeline(name):
+    # sklearn is only imported when models are fitted; cached artifacts load without it
+    from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    if name == 'delay':
+        return Pipeline([('scaler', StandardScaler()), ('regressor', RandomForestRegressor(**HYPERPARAMS))])
+    return Pipeline([('scaler', StandardScaler()), ('classifier', RandomForestClassifier(**HYPERPARAMS))])
+
+def _training_sets(df):
+    """(X, y) of each model; the platform model only learns from rows where a platform was assigned."""
+    sets = {}
+    for name, target in TARGETS.items():
+        rows = df[df[target] > 0] if name == 'platform' else df
+        if not rows.empty:
+            # Models are fitted on plain arrays so the hot path can score NumPy rows directly
+            sets[name] = (rows[FEATURES].to_numpy(dtype=float), rows[target].to_numpy())
+    return sets
+
+def _can_grow(pipeline, y):
+    """Whether a fitted forest can take trees fitted on targets y (a classifier needs the same classes)."""
+    if pipeline is None:
+        return False
+    forest = pipeline.steps[-1][1]
+    return not hasattr(forest, 'classes_') or np.array_equal(np.unique(y), forest.classes_)
 
 class AIManager:
-    def __init__(self, historical_data_path='data/historical.csv', n_platforms_b=3):
+    def __init__(self, historical_data_path='data/historical.csv', n_platforms_b=3, backend='compiled', cache_dir=None):
         self.data_path = historical_data_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(historical_data_path), 'model_cache')
+        self.artifact_dir = None
         self.delay_model = None
         self.platform_model = None
         self.drive_mode_model = None # New model for energy efficiency
         self.n_platforms_b = n_platforms_b
+        self.backend = backend # 'compiled' (flattened forests) or 'sklearn' (Pipeline.predict)
         self.is_trained = False
+        self.trained_rows = 0
+        self.training_report = None # Timings of the last fit: see train_models and update_models
+        self._load_lock = threading.Lock()
+        self._loader = None
+        self._table_lock = threading.Lock()
+        self._decision_tables = {}
 
-    def train_models(self):
+    def train_models(self, n_jobs=-1):
+        """
+        Fits the three models from scratch on the whole CSV. They are fitted side by side, each
+        forest growing its trees on `n_jobs` cores (-1: all); timings go to self.training_report.
+        """
         if not os.path.exists(self.data_path):
             return
+        start = time.perf_counter()
+        df = load_history(self.data_path, self.cache_dir)
+        read_s = time.perf_counter() - start
 
-        df = pd.read_csv(self.data_path)
-        
-        features = [
-            'time_of_day', 'day_of_week', 'num_trains_at_station_A', 
-            'num_trains_at_station_B', 'stop_duration_B', 'train_priority',
-            'downstream_block_free', 'is_disaster_mode'
-        ]
-        X = df[features]
-
-        # Train Delay Model
-        y_delay = df['delay_minutes']
-        self.delay_model = Pipeline([('scaler', StandardScaler()), ('regressor', RandomForestRegressor(n_estimators=50, random_state=42))])
-        self.delay_model.fit(X, y_delay)
-
-        # Train Platform Model
-        platform_data = df[df['assigned_platform_B'] > 0]
-        if not platform_data.empty:
-            self.platform_model = Pipeline([('scaler', StandardScaler()), ('classifier', RandomForestClassifier(n_estimators=50, random_state=42))])
-            self.platform_model.fit(platform_data[features], platform_data['assigned_platform_B'])
-        
-        # NEW: Train Drive Mode Model
-        y_drive_mode = df['optimal_drive_mode']
-        self.drive_mode_model = Pipeline([('scaler', StandardScaler()), ('classifier', RandomForestClassifier(n_estimators=50, random_state=42))])
-        self.drive_mode_model.fit(X, y_drive_mode)
-        
+        fit_s = self._fit_models(_training_sets(df), n_jobs)
+        self._build_scorers()
         self.is_trained = True
+        self.trained_rows = len(df)
+        self._report('full', len(df), len(df), read_s, fit_s, start)
         print("✅ AI models (including new Drive Mode model) trained successfully.")
 
+    def update_models(self, new_rows, n_jobs=-1, full_data=None):
+        """
+        Grows the fitted forests with trees fitted on `new_rows` only (warm start) instead of
+        refitting on everything. Each model gets trees in proportion to the new rows' share of
+        the data, and new rows are scaled like the old ones. A classifier whose classes the new
+        rows don't match cannot be grown, so it is refitted on `full_data()` (default: the CSV
+        plus the new rows).
+        """
+        start = time.perf_counter()
+        if self.artifact_dir is not None:
+            self.load_pipelines()
+        new_trees = max(1, min(HYPERPARAMS['n_estimators'], round(HYPERPARAMS['n_estimators'] * len(new_rows) / max(self.trained_rows, 1))))
+        if full_data is None:
+            full_data = lambda: pd.concat([load_history(self.data_path, self.cache_dir), new_rows], ignore_index=True)
+
+        sets, refit = _training_sets(new_rows), {}
+        for name, (_, y) in list(sets.items()):
+            if not _can_grow(getattr(self, f"{name}_model"), y):
+                refit[name] = sets.pop(name)
+        read_s = 0.0
+        if refit:
+            read_start = time.perf_counter()
+            full_sets = _training_sets(full_data())
+            read_s = time.perf_counter() - read_start
+            refit = {name: full_sets[name] for name in refit if name in full_sets}
+
+        fit_s = self._fit_models(sets, n_jobs, new_trees)
+        fit_s.update({f"{name} (refit)": seconds for name, seconds in self._fit_models(refit, n_jobs).items()})
+        self._build_scorers()
+        self._decision_tables = {}
+        self.is_trained = True
+        self.trained_rows += len(new_rows)
+        self._report('incremental', len(new_rows), self.trained_rows, read_s, fit_s, start)
+        print(f"✅ AI models updated with {len(new_rows)} new rows ({new_trees} trees added per model).")
+
+    def _fit_models(self, sets, n_jobs, new_trees=0):
+        """Fits (or, with new_trees, grows) the model of each training set at once; returns seconds per model."""
+        def fit(name):
+            X, y = sets[name]
+            model_start = time.perf_counter()
+            if new_trees:
+                pipeline = getattr(self, f"{name}_model")
+                forest = pipeline.steps[-1][1]
+                forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees, n_jobs=n_jobs)
+                forest.fit(pipeline.steps[0][1].transform(X), y) # The scaler stays as fitted, so old trees still apply
+            else:
+                pipeline = _new_pipeline(name)
+                forest = pipeline.steps[-1][1]
+                forest.set_params(n_jobs=n_jobs)
+                pipeline.fit(X, y)
+            forest.set_params(warm_start=False, n_jobs=None) # Single-row predictions shouldn't spin up workers
+            return name, pipeline, time.perf_counter() - model_start
+
+        fit_s = {}
+        if not sets:
+            return fit_s
+        with ThreadPoolExecutor(max_workers=len(sets)) as pool: # Tree building releases the GIL
+            for name, pipeline, seconds in pool.map(fit, list(sets)):
+                setattr(self, f"{name}_model", pipeline)
+                fit_s[name] = seconds
+        return fit_s
+
+    def _report(self, mode, rows, trained_rows, read_s, fit_s, start):
+        self.training_report = {'mode': mode, 'rows': rows, 'trained_rows': trained_rows, 'read_s': read_s,
+                                'fit_s': fit_s, 'total_s': time.perf_counter() - start}
+        logger.info("%s training on %d rows: %.2fs (read %.2fs; %s)", mode.capitalize(), rows, self.training_report['total_s'],
+                    read_s, ", ".join(f"{name} {seconds:.2f}s" for name, seconds in fit_s.items()))
+
+    def _digest_data(self):
+        """(hash of the CSV bytes, cache key: that hash plus the feature list and hyperparameters)."""
+        digest = hashlib.sha256()
+        with open(self.data_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        data_sha = digest.hexdigest()
+        digest.update(json.dumps({
+            'features': FEATURES, 'hyperparams': HYPERPARAMS,
+            'sklearn': importlib.metadata.version('scikit-learn'), 'artifact_version': ARTIFACT_VERSION
+        }, sort_keys=True).encode())
+        return data_sha, digest.hexdigest()
+
+    def cache_key(self):
+        """Content hash of the training CSV, the feature list and the hyperparameters."""
+        return self._digest_data()[1]
+
+    def load_or_train(self, n_jobs=-1):
+        """
+        Loads fitted models from the on-disk artifact cache. On a miss, models cached for an
+        earlier version of the CSV that the current one only appends to are grown with the
+        appended rows; otherwise they are trained from scratch. Either way the result is saved.
+        """
+        with self._load_lock:
+            if self.artifact_dir is not None or not os.path.exists(self.data_path):
+                return # Already loaded, or nothing to train on
+
+            data_sha, key = self._digest_data()
+            artifact_dir = os.path.join(self.cache_dir, key)
+            if os.path.exists(os.path.join(artifact_dir, 'meta.json')):
+                self._load_artifact(artifact_dir)
+                print("✅ AI models loaded from artifact cache.")
+            else:
+                base = self._find_base_artifact()
+                if base is not None:
+                    base_dir, data_bytes = base
+                    self._load_artifact(base_dir)
+                    self.update_models(read_history(self.data_path, data_bytes), n_jobs,
+                                       full_data=lambda: load_history(self.data_path, self.cache_dir))
+                else:
+                    self.train_models(n_jobs)
+                self._save_artifact(artifact_dir, data_sha)
+            self.artifact_dir = artifact_dir
+
+    def append_training_data(self, rows, n_jobs=-1):
+        """
+        Appends rows in the CSV's schema (field records, labelled simulation output) to the
+        training data and, if models are loaded, grows them with just those rows.
+        """
+        with open(self.data_path, 'rb') as f:
+            ends_with_newline = f.seek(0, os.SEEK_END) == 0 or (f.seek(-1, os.SEEK_END), f.read(1))[1] == b'\n'
+        with open(self.data_path, 'a', newline='') as f:
+            if not ends_with_newline:
+                f.write('\n')
+            rows[pd.read_csv(self.data_path, nrows=0).columns].to_csv(f, header=False, index=False)
+        if self.artifact_dir is not None:
+            self.artifact_dir = None
+            self.load_or_train(n_jobs)
+
+    def _find_base_artifact(self):
+        """The cached artifact trained on the longest prefix of the current CSV, as (dir, bytes)."""
+        if not os.path.isdir(self.cache_dir):
+            return None
+        size = os.path.getsize(self.data_path)
+        candidates = []
+        for entry in os.listdir(self.cache_dir):
+            try:
+                with open(os.path.join(self.cache_dir, entry, 'meta.json')) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if meta.get('data_bytes', size) < size and meta.get('hyperparams') == HYPERPARAMS and meta.get('features') == FEATURES:
+                candidates.append((meta['data_bytes'], meta['data_sha'], entry))
+        for data_bytes, data_sha, entry in sorted(candidates, reverse=True):
+            digest = hashlib.sha256()
+            with open(self.data_path, 'rb') as f:
+                remaining = data_bytes
+                while remaining:
+                    chunk = f.read(min(1 << 20, remaining))
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+            if digest.hexdigest() == data_sha:
+                return os.path.join(self.cache_dir, entry), data_bytes
+        return None
+
+    def load_in_background(self):
+        """Starts load_or_train on a daemon thread and returns immediately; see wait_until_ready."""
+        if self._loader is None:
+            self._loader = threading.Thread(target=self.load_or_train, name="ai-model-loader", daemon=True)
+            self._loader.start()
+        return self
+
+    def wait_until_ready(self):
+        """Blocks until the models are loaded (loading them here if no background load was started)."""
+        if self._loader is not None:
+            self._loader.join()
+        self.load_or_train()
+        return self
+
+    def decision_table(self, max_occupancy):
+        """
+        A DecisionTable of these models for stations of up to max_occupancy platforms, built
+        once and saved in the model artifact so later runs and workers just load it. Returns
+        None while no models are trained.
+        """
+        if not self.is_trained:
+            return None
+        with self._table_lock:
+            if max_occupancy not in self._decision_tables:
+                path = os.path.join(self.artifact_dir, f"decision_table_{max_occupancy}.npz") if self.artifact_dir else None
+                if path is not None and os.path.exists(path):
+                    table = DecisionTable.load(self, path)
+                else:
+                    table = self.build_decision_table(max_occupancy)
+                    if path is not None:
+                        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+                        table.save(tmp_path)
+                        os.replace(tmp_path, path)
+                self._decision_tables[max_occupancy] = table
+            return self._decision_tables[max_occupancy]
+
+    def build_decision_table(self, max_occupancy):
+        """Scores every point of the feature grid with each model (no caching; see decision_table)."""
+        grid = DecisionTable.grid(max_occupancy)
+        platform = self._platform_scorer.predict(grid) if self._platform_scorer is not None else np.ones(len(grid), dtype=int)
+        return DecisionTable(self, max_occupancy, self.predict_delay_batch(grid), platform, self.predict_drive_mode_batch(grid))
+
+    def _save_artifact(self, artifact_dir, data_sha):
+        # Written to a temporary directory first so a reader never sees a half-written artifact
+        tmp_dir = f"{artifact_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        # The data's size and hash let a later, appended-to CSV grow these models instead of refitting
+        meta = {'features': FEATURES, 'hyperparams': HYPERPARAMS, 'models': {}, 'rows': self.trained_rows,
+                'data_bytes': os.path.getsize(self.data_path), 'data_sha': data_sha}
+        for name in MODEL_NAMES:
+            pipeline = getattr(self, f"{name}_model")
+            if pipeline is None:
+                meta['models'][name] = None
+                continue
+            with open(os.path.join(tmp_dir, f"{name}.pkl"), 'wb') as f:
+                pickle.dump(pipeline, f)
+            meta['models'][name] = CompiledForest.from_pipeline(pipeline).save(tmp_dir, name)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp_dir, artifact_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True) # Another process saved the same artifact first
+
+    def _load_artifact(self, artifact_dir):
+        with open(os.path.join(artifact_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        self.artifact_dir = artifact_dir
+        self.trained_rows = meta.get('rows', 0)
+        if self.backend == 'compiled':
+            # Forest arrays are memory-mapped; the sklearn pipelines stay on disk until load_pipelines()
+            self.delay_model = self.platform_model = self.drive_mode_model = None
+            scorers = {name: CompiledForest.load(artifact_dir, name, model_meta) if model_meta else None
+                       for name, model_meta in meta['models'].items()}
+            self._delay_scorer = scorers['delay']
+            self._platform_scorer = scorers['platform']
+            self._drive_mode_scorer = scorers['drive_mode']
+        else:
+            self.load_pipelines()
+            self._build_scorers()
+        self.is_trained = True
+
+    def load_pipelines(self):
+        """Unpickles the fitted sklearn pipelines of a cached artifact if they are not loaded yet."""
+        for name in MODEL_NAMES:
+            path = os.path.join(self.artifact_dir, f"{name}.pkl")
+            if getattr(self, f"{name}_model") is None and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    setattr(self, f"{name}_model", pickle.load(f))
+
+    def _build_scorers(self):
+        """Picks what scores each model on the hot path: the fitted pipeline or its compiled form."""
+        prepare = CompiledForest.from_pipeline if self.backend == 'compiled' else (lambda pipeline: pipeline)
+        self._delay_scorer = prepare(self.delay_model)
+        self._platform_scorer = prepare(self.platform_model) if self.platform_model is not None else None
+        self._drive_mode_scorer = prepare(self.drive_mode_model)
+
+    # --- Batched inference: one vectorized predict per model for many rows ---
+    def predict_delay_batch(self, features):
+        X = _as_matrix(features)
+        if not self.is_trained: return np.full(len(X), 2.0)
+        return np.maximum(0, self._delay_scorer.predict(X))
+
+    def predict_platform_batch(self, features, n_platforms=None):
+        X = _as_matrix(features)
+        if not self.is_trained or self._platform_scorer is None: return np.ones(len(X), dtype=int)
+        return np.clip(self._platform_scorer.predict(X), 1, n_platforms or self.n_platforms_b).astype(int)
+
+    def predict_drive_mode_batch(self, features):
+        X = _as_matrix(features)
+        if not self.is_trained: return np.ones(len(X), dtype=int)
+        return self._drive_mode_scorer.predict(X)
+
     def predict_delay(self, features_df):
         if not self.is_trained: return 2
-        return max(0, self.delay_model.predict(features_df)[0])
+        return max(0, self._delay_scorer.predict(_as_matrix(features_df))[0])
 
-    def predict_platform(self, features_df):
-        if not self.is_trained or self.platform_model is None: return 1
-        prediction = self.platform_model.predict(features_df)
-        return int(max(1, min(prediction[0], self.n_platforms_b)))
+    def predict_platform(self, features_df, n_platforms=None):
+        """Predicts a platform at station B, clamped to n_platforms (defaults to n_platforms_b)."""
+        if not self.is_trained or self._platform_scorer is None: return 1
+        prediction = self._platform_scorer.predict(_as_matrix(features_df))
+        return int(max(1, min(prediction[0], n_platforms or self.n_platforms_b)))
 
     def predict_drive_mode(self, features_df):
         """Predicts the optimal drive mode (1=Full Speed, 2=Eco-Coast)."""
         if not self.is_trained: return 1 # Default to Full Speed
-        return self.drive_mode_model.predict(features_df)[0]
\ No newline at end of file
+        return self._drive_mode_scorer.predict(_as_matrix(features_df))[0]
\ No newline at end of file
@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
+import random
+import uuid
 from ai.model import AIManager
-from simulation.env import run_simulation
-from dashboard.ui import setup_sidebar, display_main_dashboard
+from simulation.env import stream_simulation
+from simulation.parallel import run_simulations_parallel, make_pool, simulate_horizon, simulate_branches
+from simulation.branching import what_if_branches, PLANNED, WHAT_IF
+from simulation.replications import run_replications, summarize_replications
+from dashboard.ui import setup_sidebar, display_main_dashboard, display_replication_summary, display_kpi_dashboard
 from dashboard.kpi import calculate_kpis
+from simulation.topology import stop_platforms
+from simulation.sweep import grid_points, latin_hypercube_points, run_sweep
+from simulation.cache import ScenarioCache, model_version, scenario_key
 
 st.set_page_config(page_title="AI Train Traffic Control", page_icon="🚄", layout="wide")
 
@@ -11,14 +19,54 @@ st.title("🚄 AI-Powered Train Traffic Control Simulator")
 st.markdown("Use the controls on the left to configure and run a simulation. The full results will be displayed once the simulation is complete.")
 
 @st.cache_resource
-def get_ai_manager(platforms_b):
-    ai_manager = AIManager(n_platforms_b=platforms_b)
-    ai_manager.train_models()
-    return ai_manager
+def get_ai_manager():
+    # One manager serves every configuration: the platform count is applied at prediction time.
+    # Models load on a background thread so the sidebar renders without waiting for them.
+    return AIManager().load_in_background()
+
+@st.cache_resource
+def get_scenario_cache():
+    return ScenarioCache()
+
+RUN_LABELS = {'non_ai': "Baseline (Non-AI)", 'ai': "Optimized (AI-Powered)"}
+
+def run_live(config, ai_manager):
+    """
+    Streams both runs side by side in this script run, refreshing their KPIs and a delay
+    chart in place as simulated time advances. Returns each run's (log_df, alerts, controller).
+    """
+    def own_rng():
+        # Unseeded runs each get their own random stream, as they would in separate processes
+        return {} if config.get('seed') is not None else {'rng': random.Random()}
+    streams = {
+        'non_ai': stream_simulation({**config, 'is_ai_controlled': False, 'ai_manager': None, **own_rng()}),
+        'ai': stream_simulation({**config, 'is_ai_controlled': True, 'ai_manager': ai_manager, **own_rng()})
+    }
+    kpi_placeholder, chart_placeholder = st.empty(), st.empty()
+    latest, history, results = {}, [], {}
+    while streams:
+        for name in list(streams):
+            try:
+                update = next(streams[name])
+            except StopIteration as finished:
+                results[name] = finished.value
+                del streams[name]
+                continue
+            latest[name] = update['kpis']
+            history.append({'Simulation Time (minutes)': update['time'], 'Run': RUN_LABELS[name], 'Average Delay': update['kpis']['Average Delay']})
+
+        with kpi_placeholder.container():
+            for column, name in zip(st.columns(2), RUN_LABELS):
+                if name in latest:
+                    with column:
+                        display_kpi_dashboard(latest[name], RUN_LABELS[name])
+        chart_placeholder.line_chart(pd.DataFrame(history).pivot_table(
+            index='Simulation Time (minutes)', columns='Run', values='Average Delay'))
+    return results
 
 def main():
     config, run_button = setup_sidebar()
-    ai_manager = get_ai_manager(config['platforms_b'])
+    ai_manager = get_ai_manager()
 
     if 'simulation_results' not in st.session_state:
         st.session_state.simulation_results = None
@@ -28,35 +76,107 @@ def main():
 
     if run_button:
         st.session_state.simulation_results = None
+        # The detailed runs cover the first day; longer horizons are aggregated per day further down
+        horizon_days = config['days']
+        config = {**config, 'days': 1}
         
         with progress_placeholder.container():
-            with st.spinner('Running full simulation... this may take a moment.'):
-                st.write("Running Baseline (Non-AI) Simulation...")
-                non_ai_progress = st.progress(0)
-                config_non_ai = {**config, 'is_ai_controlled': False, 'ai_manager': None}
-                log_df_non_ai, _, _ = run_simulation(config_non_ai, non_ai_progress)
-                
-                st.write("Running Optimized (AI) Simulation...")
-                ai_progress = st.progress(0)
-                config_ai = {**config, 'is_ai_controlled': True, 'ai_manager': ai_manager}
-                log_df_ai, alerts_ai, controller_ai = run_simulation(config_ai, ai_progress)
-
-        with st.spinner("Calculating KPIs and generating reports..."):
-            # CORRECTED: Added the missing config['platforms_b'] argument to both calls
-            kpis_non_ai = calculate_kpis(log_df_non_ai, config['num_trains'], 24, config['platforms_b'])
-            kpis_ai = calculate_kpis(log_df_ai, config['num_trains'], 24, config['platforms_b'])
-            
-            st.session_state.simulation_results = {
-                "non_ai": {"logs": log_df_non_ai, "kpis": kpis_non_ai},
-                "ai": {
-                    "logs": log_df_ai, "kpis": kpis_ai, 
-                    "alerts": alerts_ai,
-                    "decisions": controller_ai.decision_logs
+            with st.spinner('Loading AI models...'):
+                ai_manager.wait_until_ready()
+            # Seeded runs of a config simulated before (with the same models) come from the scenario cache
+            cache_key = scenario_key(config, model_version(ai_manager)) if config['use_cache'] else None
+            results = get_scenario_cache().get(cache_key) if cache_key else None
+            from_cache = results is not None
+            forks = None
+            if not from_cache and config['what_if_at'] and config['what_if_train']:
+                with st.spinner(f"Simulating to minute {config['what_if_at']}, then forking the what-if..."):
+                    # Each controller's run is simulated once to the what-if minute, then forked into
+                    # the plan going on as before and the selected train breaking down there
+                    prefix_config, branches = what_if_branches(config)
+                    with make_pool(ai_manager, len(RUN_LABELS)) as pool:
+                        futures = {name: pool.submit(simulate_branches, name, {**prefix_config, 'is_ai_controlled': name == 'ai', 'ai_manager': None},
+                                                     config['what_if_at'], branches) for name in RUN_LABELS}
+                        forks = {name: future.result()[1] for name, future in futures.items()}
+                    log_df_non_ai = forks['non_ai'][WHAT_IF][0]
+                    log_df_ai, alerts_ai, decision_logs_ai, _ = forks['ai'][WHAT_IF]
+            elif not from_cache and config['live_updates']:
+                runs = run_live(config, ai_manager)
+                log_df_non_ai, _, _ = runs['non_ai']
+                log_df_ai, alerts_ai, controller_ai = runs['ai']
+                decision_logs_ai = controller_ai.decision_logs
+            elif not from_cache:
+                with st.spinner('Running full simulation... this may take a moment.'):
+                    # Both runs go to a process pool at once, so the wait is that of the slower run
+                    st.write("Running Baseline (Non-AI) and Optimized (AI) Simulations...")
+                    progress_bars = {'non_ai': st.progress(0, text="Baseline (Non-AI)"), 'ai': st.progress(0, text="Optimized (AI)")}
+                    runs = run_simulations_parallel({
+                        'non_ai': {**config, 'is_ai_controlled': False},
+                        'ai': {**config, 'is_ai_controlled': True}
+                    }, progress_bars, ai_manager)
+                    log_df_non_ai, _, _ = runs['non_ai']
+                    log_df_ai, alerts_ai, decision_logs_ai = runs['ai']
+
+        if not from_cache:
+            with st.spinner("Calculating KPIs and generating reports..."):
+                # Platform utilization is measured against the platforms at the line's stops (Station B here)
+                kpis_non_ai = calculate_kpis(log_df_non_ai, config['num_trains'], 24, stop_platforms(config))
+                kpis_ai = calculate_kpis(log_df_ai, config['num_trains'], 24, stop_platforms(config))
+                results = {
+                    "non_ai": {"logs": log_df_non_ai, "kpis": kpis_non_ai},
+                    "ai": {
+                        "logs": log_df_ai, "kpis": kpis_ai, 
+                        "alerts": alerts_ai,
+                        "decisions": decision_logs_ai
+                    }
                 }
-            }
+                if forks:
+                    for name in RUN_LABELS:
+                        results[name]["planned_kpis"] = forks[name][PLANNED][3]
+                if cache_key:
+                    get_scenario_cache().put(cache_key, results)
+
+        # A new run_id and dict per run: the dashboard caches what it derives from them (see ui.memoized)
+        st.session_state.simulation_results = {"run_id": uuid.uuid4().hex, "config": config, "from_cache": from_cache, **results}
+
+        if config['replications'] > 1:
+            with st.spinner(f"Running {config['replications']} Monte Carlo replications per controller..."):
+                # Seeded replications of both controllers; the summary table refreshes as runs finish
+                run_config = {k: v for k, v in config.items() if k not in ('replications', 'base_seed')}
+                rows, n_total = [], 2 * config['replications']
+                live_table = st.empty()
+                def on_result(row):
+                    rows.append(row)
+                    with live_table.container():
+                        display_replication_summary(summarize_replications(pd.DataFrame(rows)), len(rows), n_total)
+                replications = run_replications(run_config, config['replications'], config['base_seed'], ai_manager, on_result=on_result)
+                st.session_state.simulation_results["replications"] = summarize_replications(replications)
+                live_table.empty()
+
+        if horizon_days > 1:
+            with st.spinner(f"Simulating {horizon_days} days of the recurring timetable..."):
+                with make_pool(ai_manager, len(RUN_LABELS)) as pool:
+                    futures = {label: pool.submit(simulate_horizon, name, {**config, 'days': horizon_days, 'is_ai_controlled': name == 'ai', 'ai_manager': None})
+                               for name, label in RUN_LABELS.items()}
+                    st.session_state.simulation_results["horizon"] = {label: future.result()[1] for label, future in futures.items()}
         
+        if config['sweep']:
+            sweep = config['sweep']
+            points = (latin_hypercube_points(sweep['space'], sweep['samples'], config['base_seed']) if sweep['samples']
+                      else grid_points(sweep['space']))
+            with st.spinner(f"Sweeping {len(points)} scenarios for both controllers..."):
+                base_config = {k: v for k, v in config.items() if k not in ('replications', 'base_seed', 'sweep', 'seed')}
+                sweep_progress, finished = st.progress(0.0, text="Parameter sweep"), []
+                def on_sweep_result(row):
+                    finished.append(row)
+                    sweep_progress.progress(len(finished) / (2 * len(points)), text=f"Parameter sweep: {len(finished)} of {2 * len(points)} runs")
+                st.session_state.simulation_results["sweep"] = run_sweep(base_config, points, config.get('seed') or 0, ai_manager, on_result=on_sweep_result)
+                sweep_progress.empty()
+
         progress_placeholder.empty()
-        st.success("✅ Simulation Complete! View the results below.")
+        if from_cache:
+            st.success("✅ Loaded from the scenario cache! View the results below.")
+        else:
+            st.success("✅ Simulation Complete! View the results below.")
     
     if st.session_state.simulation_results:
         with results_placeholder.container():
@@ -0,0 +1,326 @@
+"""
+Benchmarks model training and the simulation, inference and KPI hot paths with fixed seeds and configs.
+
+    python benchmark.py                          # all configs, results to benchmark_results.json
+    python benchmark.py --configs favor_baseline showcase_ai --out before.json
+    python benchmark.py --compare before.json    # also prints the change against an earlier run
+    python benchmark.py --imports                # import-time profile of the app's entry points
+
+Dashboard builders that need optional packages (plotly, or jinja2 for the styled summary
+table) are reported as skipped when those are not installed.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from ai.model import AIManager
+from ai.features import extract_features, extract_feature_row
+from ai.history import load_history, read_history
+from simulation.env import setup_simulation_environment, run_simulation
+from simulation.horizon import run_long_simulation
+from simulation.progress import NullProgress
+from simulation.topology import stop_platforms
+from simulation.sweep import grid_points, run_sweep
+from simulation.branching import Breakdown, run_branches, _replay_branches
+from dashboard.kpi import calculate_kpis
+from dashboard.intervals import TrainIntervals
+
+SEED = 12345
+
+# Entry points whose import time is profiled with --imports
+IMPORT_TARGETS = ['app', 'dashboard.ui', 'simulation.cli', 'ai.model', 'simulation.env']
+
+# The two sidebar presets (dashboard.ui.setup_sidebar) and scaled-up variants
+CONFIGS = {
+    'favor_baseline': dict(num_trains=12, platforms_a=3, platforms_b=3, platforms_c=3, disaster_mode=False),
+    'showcase_ai': dict(num_trains=40, platforms_a=2, platforms_b=1, platforms_c=2, disaster_mode=True),
+    'scaled_500': dict(num_trains=500, platforms_a=3, platforms_b=3, platforms_c=3, disaster_mode=False),
+    'scaled_5000': dict(num_trains=5000, platforms_a=3, platforms_b=3, platforms_c=3, disaster_mode=False),
+    'scaled_10000': dict(num_trains=10000, platforms_a=3, platforms_b=3, platforms_c=3, disaster_mode=False),
+    'corridor_30': dict(num_trains=200, platforms_a=3, platforms_b=3, platforms_c=3, disaster_mode=False, topology='data/corridor_30.yaml'),
+}
+# The presets keep the app's one-day horizon; scaled runs go on until every train has arrived
+STOP_TIMES = {'scaled_500': float('inf'), 'scaled_5000': float('inf'), 'scaled_10000': float('inf'), 'corridor_30': float('inf')}
+# Long-horizon runs of the favor_baseline timetable; peak memory should not grow with the days
+HORIZON_DAYS = [7, 28]
+# Training data is resampled to this many rows, then grown by APPEND_ROWS for the incremental update
+TRAINING_ROWS, APPEND_ROWS = 50000, 2500
+# What-if branches of four weeks of the favor_baseline AI timetable fork at noon of the last day
+BRANCH_DAYS, BRANCH_AT = 28, 27 * 1440 + 720
+
+class CountingManager:
+    """Wraps an AIManager and counts calls to its predict methods."""
+    def __init__(self, manager):
+        self.manager = manager
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.manager, name)
+        if not name.startswith('predict_'):
+            return attr
+        def counted(features, *args, **kwargs):
+            self.calls += 1
+            return attr(features, *args, **kwargs)
+        return counted
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """Best wall time in seconds over `repeat` calls, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def per_call(fn, *args, number=1000):
+    """Mean latency in microseconds of a fast call."""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn(*args)
+    return (time.perf_counter() - start) / number * 1e6
+
+def peak_memory_mb(fn, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def optional(module, function, *args):
+    """Times a dashboard builder, or records why it was skipped."""
+    try:
+        return {'seconds': timed(getattr(importlib.import_module(module), function), *args)[0]}
+    except (ImportError, AttributeError) as e:
+        return {'skipped': str(e)}
+
+def bench_models(ai_manager):
+    results = {}
+    fresh = AIManager(ai_manager.data_path)
+    results['train_models_s'], _ = timed(fresh.train_models)
+    fresh.load_or_train() # Warm the artifact cache so the timing below is the load path
+    results['load_or_train_cached_s'], _ = timed(AIManager(ai_manager.data_path).load_or_train)
+
+    row = np.array([8, 2, 1, 2, 10, 2, 1, 0], dtype=float)
+    batch = np.tile(row, (256, 1))
+    for backend in ('compiled', 'sklearn'):
+        manager = AIManager(ai_manager.data_path, backend=backend)
+        manager.load_or_train()
+        number = 2000 if backend == 'compiled' else 100
+        results[backend] = {
+            'predict_delay_us': per_call(manager.predict_delay, row, number=number),
+            'predict_platform_us': per_call(manager.predict_platform, row, number=number),
+            'predict_drive_mode_us': per_call(manager.predict_drive_mode, row, number=number),
+            'predict_drive_mode_batch256_us': per_call(manager.predict_drive_mode_batch, batch, number=max(number // 20, 5)),
+        }
+
+    results['decision_table_build_s'], table = timed(ai_manager.build_decision_table, 3)
+    results['decision_table'] = {
+        'predict_delay_us': per_call(table.predict_delay, row, number=20000),
+        'predict_platform_us': per_call(table.predict_platform, row, number=20000),
+        'predict_drive_mode_us': per_call(table.predict_drive_mode, row, number=20000),
+        'predict_drive_mode_batch256_us': per_call(table.predict_drive_mode_batch, batch, number=100),
+    }
+    return results
+
+def bench_training(ai_manager):
+    """Data loading, full fits serially and in parallel, then a warm-start update with appended rows, on a scratch copy of the data."""
+    df = pd.read_csv(ai_manager.data_path)
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, 'historical.csv')
+        df.sample(TRAINING_ROWS, replace=True, random_state=SEED, ignore_index=True).to_csv(path, index=False)
+        cache_dir = os.path.join(scratch, 'model_cache')
+        results['load_s'] = {
+            'read_csv': timed(pd.read_csv, path)[0],
+            'typed_chunked': timed(read_history, path)[0],
+            'columnar_first': timed(load_history, path, cache_dir)[0],
+            'columnar_cached': timed(load_history, path, cache_dir, repeat=5)[0],
+        }
+        results['load_mb'] = {
+            'read_csv': pd.read_csv(path).memory_usage(deep=True).sum() / 1e6,
+            'typed': load_history(path, cache_dir).memory_usage(deep=True).sum() / 1e6,
+        }
+        manager = AIManager(path)
+        for label, n_jobs in (('full_serial', 1), ('full_parallel', -1)):
+            manager.train_models(n_jobs)
+            results[label] = manager.training_report
+        manager.load_or_train()
+        manager.append_training_data(df.sample(APPEND_ROWS, replace=True, random_state=SEED + 1, ignore_index=True))
+        results['incremental'] = manager.training_report
+    return results
+
+def bench_features(ai_manager):
+    config = {**CONFIGS['showcase_ai'], 'what_if_train': None, 'what_if_delay': 0,
+              'is_ai_controlled': True, 'ai_manager': ai_manager, 'seed': SEED}
+    trains = []
+    env, controller = setup_simulation_environment(config, trains)
+    env.run(until=1) # Creates the trains
+    args = (env, controller.stations, controller.blocks, trains[0], False)
+    out = np.empty(8)
+    return {
+        'extract_features_us': per_call(extract_features, *args, number=2000),
+        'extract_feature_row_us': per_call(extract_feature_row, *args, out, number=20000),
+    }
+
+def bench_config(name, base_config, ai_manager, measure_memory=True):
+    stop_time = STOP_TIMES.get(name, 1440)
+    results = {}
+    logs = {}
+    for label, is_ai, table in (('non_ai', False, False), ('ai', True, False), ('ai_decision_table', True, True)):
+        manager = CountingManager(ai_manager) if is_ai and not table else ai_manager if is_ai else None
+        config = {**base_config, 'what_if_train': None, 'what_if_delay': 0,
+                  'is_ai_controlled': is_ai, 'ai_manager': manager, 'seed': SEED, 'decision_table': table}
+
+        setup_s, _ = timed(setup_simulation_environment, config, [], repeat=5)
+        run_s, (log_df, _, controller) = timed(run_simulation, config, NullProgress(), stop_time)
+        entry = {
+            'setup_s': setup_s,
+            'run_s': run_s,
+            'events': controller.env.steps,
+            'events_per_s': controller.env.steps / run_s,
+            'log_rows': len(log_df),
+            'trains': len(controller.env.trains),
+            'run_us_per_train': run_s / len(controller.env.trains) * 1e6,
+        }
+        if isinstance(manager, CountingManager):
+            entry['model_calls'] = manager.calls
+            entry['model_calls_per_s'] = manager.calls / run_s
+        if measure_memory:
+            entry['run_peak_mb'] = peak_memory_mb(run_simulation, config, NullProgress(), stop_time)
+            entry['run_peak_kb_per_train'] = entry['run_peak_mb'] * 1024 / entry['trains']
+        entry['calculate_kpis_s'], _ = timed(calculate_kpis, log_df, base_config['num_trains'], 24, stop_platforms(base_config), repeat=3)
+        # The per-train views share one TrainIntervals per log, as the dashboard caches it
+        entry['train_intervals_s'], intervals = timed(TrainIntervals, log_df, repeat=3)
+        entry['train_summary'] = optional('dashboard.tables', 'generate_train_summary_df', intervals, config)
+        entry['gantt'] = optional('dashboard.graphs', 'create_train_animation', intervals)
+        results[label] = entry
+        logs[label] = intervals
+
+    results['delay_chart'] = optional('dashboard.graphs', 'create_delay_line_chart', logs['ai'], logs['non_ai'])
+    return results
+
+def bench_horizon(ai_manager, measure_memory=True):
+    results = {}
+    for days in HORIZON_DAYS:
+        config = {**CONFIGS['favor_baseline'], 'what_if_train': None, 'what_if_delay': 0, 'days': days,
+                  'is_ai_controlled': True, 'ai_manager': ai_manager, 'seed': SEED}
+        entry = {'run_s': timed(run_long_simulation, config)[0]}
+        if measure_memory:
+            entry['run_peak_mb'] = peak_memory_mb(run_long_simulation, config)
+        results[f'{days}_days'] = entry
+    return results
+
+def bench_sweep(ai_manager):
+    """A 48-point grid around the showcase preset, both controllers, across the default process pool."""
+    space = {'num_trains': [10, 20, 40, 80], 'platforms_b': [1, 2, 3], 'what_if_train': ['T05'],
+             'what_if_delay': [0, 30], 'disaster_mode': [False, True]}
+    points = grid_points(space)
+    sweep_s, runs = timed(run_sweep, {**CONFIGS['showcase_ai'], 'what_if_train': None, 'what_if_delay': 0}, points, SEED, ai_manager)
+    return {'points': len(points), 'runs': len(runs), 'sweep_s': sweep_s, 'ms_per_run': sweep_s / len(runs) * 1e3}
+
+def bench_branching(ai_manager):
+    """Breakdowns of four trains on the last of BRANCH_DAYS: forked from one shared prefix vs each replayed from t=0."""
+    config = {**CONFIGS['favor_baseline'], 'days': BRANCH_DAYS, 'what_if_train': None, 'what_if_delay': 0,
+              'is_ai_controlled': True, 'ai_manager': ai_manager, 'seed': SEED}
+    branches = {'planned': [], **{train_id: [Breakdown(train_id, 30)] for train_id in ('T333', 'T334', 'T335', 'T336')}}
+    fork_s, _ = timed(run_branches, config, BRANCH_AT, branches)
+    replay_s, _ = timed(_replay_branches, config, BRANCH_AT, branches, BRANCH_DAYS * 1440)
+    return {'branches': len(branches), 'at': BRANCH_AT, 'fork_s': fork_s, 'replay_s': replay_s}
+
+def profile_imports(module, top=10):
+    """
+    Imports a module in a fresh interpreter under -X importtime and returns its total import
+    time and the packages that take longest (self time summed per top-level package, in ms).
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1]}
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {'total_ms': sum(packages.values()) / 1000, 'slowest_ms': {name: us / 1000 for name, us in slowest}}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, previous, path=()):
+    """Prints each timing that changed, as previous -> current."""
+    for key, value in current.items():
+        old = previous.get(key) if isinstance(previous, dict) else None
+        if isinstance(value, dict):
+            compare(value, old or {}, path + (key,))
+        elif isinstance(value, float) and isinstance(old, (int, float)) and old and (key.endswith('_s') or key.endswith('_us')):
+            print(f"{'.'.join(path + (key,)):70s} {old:12.6g} -> {value:12.6g}  ({old / value if value else float('inf'):.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory runs')
+    parser.add_argument('--imports', action='store_true', help='only profile import times of the entry points')
+    args = parser.parse_args()
+
+    if args.imports:
+        for module in IMPORT_TARGETS:
+            report = profile_imports(module)
+            if 'error' in report:
+                print(f"{module}: not importable here ({report['error']})")
+                continue
+            print(f"{module}: {report['total_ms']:.0f} ms")
+            for name, ms in report['slowest_ms'].items():
+                print(f"    {name:30s} {ms:8.1f} ms")
+        return
+
+    random.seed(SEED)
+    ai_manager = AIManager()
+    ai_manager.load_or_train()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'models': bench_models(ai_manager),
+        'training': bench_training(ai_manager),
+        'features': bench_features(ai_manager),
+        'horizon': bench_horizon(ai_manager, not args.no_memory),
+        'sweep': bench_sweep(ai_manager),
+        'branching': bench_branching(ai_manager),
+        'configs': {},
+    }
+    for name in args.configs:
+        print(f"Benchmarking {name}...")
+        report['configs'][name] = bench_config(name, CONFIGS[name], ai_manager, not args.no_memory)
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Saved to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
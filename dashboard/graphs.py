@@ -1,6 +1,11 @@
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
 import pandas as pd
+from dashboard.intervals import TrainIntervals
+from dashboard.kpi import BASE_TRAVEL_TIME, STOP_ALLOWANCE
+
+LOWER_IS_BETTER = {'Average Delay', 'Total Energy', 'Max Delay'}
 
 def create_comparison_bar_chart(kpi_data_ai, kpi_data_non_ai, kpi_name):
     """Creates a bar chart comparing a single KPI for AI vs Non-AI."""
@@ -18,27 +23,38 @@ def create_comparison_bar_chart(kpi_data_ai, kpi_data_non_ai, kpi_name):
     )
     return fig
 
+def create_sweep_heatmap(deltas, x, y, kpi_name):
+    """Heatmap of a KPI's AI-minus-baseline change over two swept parameters, averaged over the rest."""
+    table = deltas.pivot_table(index=y, columns=x, values=kpi_name, aggfunc='mean')
+    # Blue marks where the AI does better, whichever direction that is for the KPI
+    colorscale = 'RdBu_r' if kpi_name in LOWER_IS_BETTER else 'RdBu'
+    fig = go.Figure(data=go.Heatmap(
+        z=table.to_numpy(), x=[str(v) for v in table.columns], y=[str(v) for v in table.index],
+        colorscale=colorscale, zmid=0, colorbar=dict(title="AI − Baseline")
+    ))
+    fig.update_layout(
+        title_text=f'{kpi_name}: AI minus Baseline',
+        xaxis_title=x,
+        yaxis_title=y,
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=350
+    )
+    return fig
+
 def create_delay_line_chart(log_df_ai, log_df_non_ai):
-    """Creates a line chart showing cumulative delays over time."""
+    """Creates a line chart showing cumulative delays over time. Takes logs or their TrainIntervals."""
     def get_cumulative_delay(log_df):
-        delays = []
-        base_travel_time = 110
-        for train_id in sorted(log_df['train_id'].unique()):
-            train_logs = log_df[log_df['train_id'] == train_id]
-            final_arrival = train_logs[train_logs['event'] == 'arrive_final']
-            if not final_arrival.empty:
-                actual_arrival_time = final_arrival.iloc[0]['time']
-                departure_time = train_logs.iloc[0]['time']
-                # Simplified schedule for graphing
-                stop_at_b = not train_logs[train_logs['event'] == 'at_platform'].empty
-                stop_duration = 10 if stop_at_b else 0 # Assume avg stop for schedule
-                scheduled_arrival = departure_time + base_travel_time + stop_duration
-                delay = max(0, actual_arrival_time - scheduled_arrival)
-                delays.append({'time': actual_arrival_time, 'delay': delay})
-        if not delays:
+        trains = TrainIntervals.of(log_df).trains
+        trains = trains[trains['first_arrive_final'].notna()]
+        if trains.empty:
             return pd.DataFrame(columns=['time', 'cumulative_delay'])
-            
-        delay_df = pd.DataFrame(delays).sort_values('time')
+
+        # Simplified schedule for graphing: the route's run time plus an average stop at each station served
+        base_travel_time = np.nan_to_num(trains['scheduled_run_time'].to_numpy(), nan=BASE_TRAVEL_TIME)
+        scheduled_arrival = trains['start'].to_numpy() + base_travel_time + STOP_ALLOWANCE * trains['stops'].to_numpy()
+        delay_df = pd.DataFrame({'time': trains['first_arrive_final'].to_numpy(),
+                                 'delay': np.maximum(0, trains['first_arrive_final'].to_numpy() - scheduled_arrival)})
+        delay_df = delay_df.sort_values('time', kind='stable')
         delay_df['cumulative_delay'] = delay_df['delay'].cumsum()
         return delay_df
 
@@ -66,52 +82,25 @@ def create_delay_line_chart(log_df_ai, log_df_non_ai):
 def create_train_animation(log_df):
     """
     Creates a robust Gantt chart by explicitly finding start and end events for major activities.
+    Takes a log or its TrainIntervals.
     """
-    if log_df.empty:
+    intervals = TrainIntervals.of(log_df)
+    if not len(intervals):
         return go.Figure().update_layout(title="No train data to display", height=300)
 
-    gantt_data = []
-    # Loop through each train and build its activity timeline
-    for train_id in sorted(log_df['train_id'].unique()):
-        train_logs = log_df[log_df['train_id'] == train_id].sort_values(by='time')
-
-        # --- Activity 1: Traveling on Track A -> B ---
-        start_ab_log = train_logs[train_logs['details'] == 'Traveling from A to B']
-        end_ab_log = train_logs[train_logs['details'] == 'Finished travel to B']
-        if not start_ab_log.empty and not end_ab_log.empty:
-            gantt_data.append(dict(
-                Task="Track A-B", 
-                Start=start_ab_log.iloc[0]['time'], 
-                Finish=end_ab_log.iloc[0]['time'], 
-                Resource=train_id
-            ))
+    # --- Track activities and waiting at station platforms, each train's tracks first ---
+    tracks = intervals.blocks
+    stays = intervals.stays
+    df = pd.concat([
+        pd.DataFrame({'Task': "Track " + tracks['block'].astype(str).str.removeprefix('Block_').str.replace('_', '-'),
+                      'Start': tracks['start'], 'Finish': tracks['finish'], 'Resource': tracks['train_id']}),
+        pd.DataFrame({'Task': "Station " + stays['station'].astype(str),
+                      'Start': stays['start'], 'Finish': stays['finish'], 'Resource': stays['train_id']}),
+    ], ignore_index=True).sort_values('Resource', kind='stable')
 
-        # --- Activity 2: Waiting at Station B Platform ---
-        start_b_log = train_logs[train_logs['event'] == 'at_platform']
-        end_b_log = train_logs[train_logs['event'] == 'depart_station']
-        if not start_b_log.empty and not end_b_log.empty:
-            gantt_data.append(dict(
-                Task="Station B", 
-                Start=start_b_log.iloc[0]['time'], 
-                Finish=end_b_log.iloc[0]['time'], 
-                Resource=train_id
-            ))
-        
-        # --- Activity 3: Traveling on Track B -> C ---
-        start_bc_log = train_logs[train_logs['details'] == 'Traveling from B to C']
-        end_bc_log = train_logs[train_logs['details'] == 'Finished travel to C']
-        if not start_bc_log.empty and not end_bc_log.empty:
-            gantt_data.append(dict(
-                Task="Track B-C", 
-                Start=start_bc_log.iloc[0]['time'], 
-                Finish=end_bc_log.iloc[0]['time'], 
-                Resource=train_id
-            ))
-            
-    if not gantt_data:
+    if df.empty:
         return go.Figure().update_layout(title="Not enough simulation events to build timeline.", height=300)
 
-    df = pd.DataFrame(gantt_data)
     fig = px.timeline(
         df, x_start="Start", x_end="Finish", y="Resource", color="Task",
         title="Train Movement Timeline (Gantt Chart)",
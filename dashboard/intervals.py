@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# Events the per-train views read
+INTERVAL_EVENTS = ['depart', 'arrive_station', 'at_platform', 'depart_station', 'travel_start', 'travel_end', 'arrive_final']
+
+class TrainIntervals:
+    """
+    Everything the per-train views need from a log, computed in one pass.
+
+    `trains` has one row per train (sorted by id) with the first time of each of
+    INTERVAL_EVENTS, the number of stops and the scheduled run time from the depart row.
+    `blocks` holds each train's (block, start, finish) travel intervals and `stays` its
+    (station, start, finish) platform stays, each start paired with the next finish.
+    """
+
+    def __init__(self, log_df):
+        self.end_time = log_df['time'].max() if not log_df.empty else 0
+        log = log_df[log_df['event'].isin(INTERVAL_EVENTS)]
+        by_event = log.groupby(['train_id', 'event'], observed=True)['time'].agg(['min', 'count']).unstack()
+        train_ids = sorted(log_df['train_id'].unique())
+        first = by_event['min'].reindex(index=train_ids, columns=INTERVAL_EVENTS)
+
+        self.trains = first.rename(columns=lambda event: f'first_{event}')
+        self.trains['start'] = log_df.groupby('train_id', observed=True)['time'].min().reindex(train_ids)
+        self.trains['stops'] = by_event['count'].reindex(index=train_ids, columns=['at_platform']).fillna(0)['at_platform'].to_numpy()
+        scheduled = pd.Series(np.nan, index=train_ids)
+        if 'value' in log:
+            departures = log[log['event'] == 'depart']
+            scheduled = departures.groupby('train_id', observed=True)['value'].first().reindex(train_ids)
+        self.trains['scheduled_run_time'] = scheduled.to_numpy(dtype=float)
+        self.trains.index.name = 'train_id'
+
+        log = log.sort_values('time', kind='stable')
+        self.blocks = self._pair(log, 'travel_start', 'travel_end', 'block')
+        self.stays = self._pair(log, 'at_platform', 'depart_station', 'station')
+
+    @staticmethod
+    def _pair(log, start_event, finish_event, place):
+        """Matches each train's k-th start event with its k-th finish event."""
+        starts = log.loc[log['event'] == start_event, ['train_id', place, 'time']]
+        finishes = log.loc[log['event'] == finish_event, ['train_id', 'time']]
+        starts = starts.assign(k=starts.groupby('train_id', observed=True).cumcount())
+        finishes = finishes.assign(k=finishes.groupby('train_id', observed=True).cumcount())
+        pairs = starts.merge(finishes, on=['train_id', 'k'], suffixes=('_start', '_finish'))
+        pairs = pairs.rename(columns={'time_start': 'start', 'time_finish': 'finish'})
+        pairs['train_id'] = pairs['train_id'].astype(str)
+        return pairs.sort_values(['train_id', 'k'], kind='stable', ignore_index=True)[['train_id', place, 'start', 'finish']]
+
+    @classmethod
+    def of(cls, data):
+        """The intervals of a log, or `data` itself if it already is a TrainIntervals."""
+        return data if isinstance(data, cls) else cls(data)
+
+    def __len__(self):
+        return len(self.trains)
\ No newline at end of file
@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
-from dashboard import kpi, graphs, tables
+import importlib.util
+import io
+import numpy as np
+from dashboard import kpi, tables
+from dashboard.intervals import TrainIntervals
+from simulation.topology import stop_platforms
+
+DECISIONS_PER_PAGE = 50
 
 def setup_sidebar():
     """Sets up the Streamlit sidebar with user controls and scenario presets."""
@@ -28,7 +35,7 @@ def setup_sidebar():
 
     st.sidebar.header("⚙️ Manual Controls")
     
-    num_trains = st.sidebar.slider("Number of Trains", 2, 50, 15, key="num_trains")
+    num_trains = st.sidebar.number_input("Number of Trains", 2, 20000, 15, key="num_trains", help="Runs above a few hundred trains are best viewed through the KPIs; the per-train charts get crowded.")
     
     st.sidebar.subheader("Platforms")
     platforms_a = st.sidebar.slider("Station A Platforms", 1, 5, 2, key="platforms_a")
@@ -41,23 +48,65 @@ def setup_sidebar():
     st.sidebar.subheader("What-If Analysis")
     what_if_enabled = st.sidebar.toggle("Enable What-If", key="what_if_enabled")
     
-    train_list = [f"T{i:02d}" for i in range(1, num_trains + 1)]
+    train_list = [f"T{i:02d}" for i in range(1, int(num_trains) + 1)]
     
     what_if_train = st.sidebar.selectbox("Select Train to Delay", train_list, key="what_if_train", disabled=not what_if_enabled)
     what_if_delay = st.sidebar.slider("Inject Delay (minutes)", 0, 60, 10, key="what_if_delay", disabled=not what_if_enabled)
+    what_if_at = st.sidebar.slider("Inject at Minute", 0, 1380, 0, step=30, key="what_if_at", disabled=not what_if_enabled,
+                                   help="0 delays the train's departure. Later, the train breaks down wherever it is at that minute: both runs are simulated once to there, then forked into the plan as is and the breakdown, and only the rest of the day is simulated for each.")
 
     if not what_if_enabled:
-        what_if_train, what_if_delay = None, 0
+        what_if_train, what_if_delay, what_if_at = None, 0, 0
+
+    live_updates = st.sidebar.toggle("📡 Live Updates", key="live_updates", help="Stream both runs and refresh KPIs while they progress instead of waiting for the end.")
+    decision_table = st.sidebar.toggle("⚡ Precomputed AI Decisions", key="decision_table", help="Look AI decisions up in a table precomputed over every feature combination. Built once per platform count, then loaded from the model cache.")
+
+    st.sidebar.subheader("Monte Carlo")
+    replications = st.sidebar.number_input("Replications per Controller", 1, 1000, 1, key="replications", help="Above 1, seeded replications also run in parallel and their KPIs are summarized with confidence intervals.")
+    base_seed = st.sidebar.number_input("Base Seed", 0, 2**31 - 1, 0, key="base_seed", disabled=replications <= 1)
+
+    st.sidebar.subheader("Result Cache")
+    use_cache = st.sidebar.toggle("💾 Reuse Cached Results", value=False, key="use_cache", help="Seeds the runs with the Run Seed below, so a config already simulated with the same seed and models loads from disk instead of running again. Off, every run draws a new timetable.")
+    seed = st.sidebar.number_input("Run Seed", 0, 2**31 - 1, 0, key="seed", disabled=not use_cache)
+
+    st.sidebar.subheader("Parameter Sweep")
+    sweep_enabled = st.sidebar.toggle("🧪 Run Parameter Sweep", key="sweep_enabled", help="Also run both controllers over a grid of the settings below and chart where the AI gains or loses.")
+    sweep_trains = st.sidebar.slider("Trains", 2, 200, (10, 60), key="sweep_trains", disabled=not sweep_enabled)
+    sweep_platforms_b = st.sidebar.slider("Station B Platforms", 1, 5, (1, 3), key="sweep_platforms_b", disabled=not sweep_enabled)
+    sweep_delays = st.sidebar.slider("What-If Delays (minutes)", 0, 60, (0, 30), key="sweep_delays", disabled=not (sweep_enabled and what_if_enabled),
+                                     help="Swept for the What-If train selected above.")
+    sweep_disaster = st.sidebar.toggle("Both Disaster Modes", key="sweep_disaster", disabled=not sweep_enabled)
+    sweep_steps = st.sidebar.slider("Values per Range", 2, 8, 4, key="sweep_steps", disabled=not sweep_enabled)
+    sweep_samples = st.sidebar.number_input("Latin Hypercube Samples", 0, 1000, 0, key="sweep_samples", disabled=not sweep_enabled,
+                                            help="0 runs every combination; otherwise this many points spread evenly over them.")
+    sweep = None
+    if sweep_enabled:
+        space = {'num_trains': sweep_values(sweep_trains, sweep_steps), 'platforms_b': sweep_values(sweep_platforms_b, sweep_steps)}
+        if what_if_enabled:
+            space.update(what_if_train=[what_if_train], what_if_delay=sweep_values(sweep_delays, sweep_steps))
+        if sweep_disaster:
+            space['disaster_mode'] = [False, True]
+        sweep = {'space': space, 'samples': int(sweep_samples)}
+
+    st.sidebar.subheader("Long Horizon")
+    days = st.sidebar.slider("Days to Simulate", 1, 28, 1, key="days", help="Above 1, the timetable also recurs daily for this many days and KPIs are reported per day.")
 
     run_button = st.sidebar.button("🚀 Run Simulation", type="primary")
     
     config = {
-        "num_trains": num_trains, "platforms_a": platforms_a, "platforms_b": platforms_b, "platforms_c": platforms_c,
-        "disaster_mode": disaster_mode, "what_if_train": what_if_train, "what_if_delay": what_if_delay,
-        "travel_time_ab": 60, "travel_time_bc": 50
+        "num_trains": int(num_trains), "platforms_a": platforms_a, "platforms_b": platforms_b, "platforms_c": platforms_c,
+        "disaster_mode": disaster_mode, "what_if_train": what_if_train, "what_if_delay": what_if_delay, "what_if_at": what_if_at,
+        "travel_time_ab": 60, "travel_time_bc": 50,
+        "replications": int(replications), "base_seed": int(base_seed), "live_updates": live_updates,
+        "decision_table": decision_table, "days": days,
+        "use_cache": use_cache, "seed": int(seed) if use_cache else None, "sweep": sweep
     }
     return config, run_button
 
+def sweep_values(bounds, steps):
+    """Up to `steps` whole numbers spread evenly from bounds[0] to bounds[1]."""
+    return sorted({int(round(v)) for v in np.linspace(bounds[0], bounds[1], steps)})
+
 def display_kpi_dashboard(kpi_data, title):
     """Displays a set of KPIs in metric cards."""
     st.subheader(title)
@@ -73,15 +122,98 @@ def display_kpi_dashboard(kpi_data, title):
         cols[4].metric("✅ Delay Reduction", "N/A")
 
 
+def display_replication_summary(summary_df, n_done=None, n_total=None):
+    """Shows the aggregated KPI table of a Monte Carlo batch."""
+    st.header("🎲 Monte Carlo Replications")
+    if n_total is not None:
+        st.caption(f"{n_done} of {n_total} runs finished")
+    st.dataframe(summary_df.style.format(precision=2), use_container_width=True, hide_index=True)
+
+
+def display_horizon_summary(windows):
+    """Shows the per-day KPIs of the long-horizon runs of both controllers."""
+    st.header("📆 Multi-Day Operation")
+    table = pd.concat([df.assign(Run=run) for run, df in windows.items()], ignore_index=True)
+    st.line_chart(table.pivot_table(index='Window', columns='Run', values='Average Delay'))
+    st.dataframe(table.set_index(['Run', 'Window']).drop(columns=['Start', 'End']), use_container_width=True)
+
+
+def display_what_if_impact(results, config):
+    """KPIs of each controller with and without the breakdown, forked from the same run."""
+    st.header("🔀 What-If Impact")
+    st.caption(f"{config['what_if_train']} breaks down for {config['what_if_delay']} min at minute {config['what_if_at']}; "
+               "both outcomes continue the same run from there.")
+    table = pd.DataFrame({
+        "Baseline, as planned": results['non_ai']['planned_kpis'], "Baseline, with breakdown": results['non_ai']['kpis'],
+        "AI, as planned": results['ai']['planned_kpis'], "AI, with breakdown": results['ai']['kpis'],
+    }).astype(float)
+    st.dataframe(table.style.format(precision=2), use_container_width=True)
+
+
+def display_sweep_summary(results):
+    """Heatmaps of the AI's KPI changes over two swept parameters, and the table of every sweep run."""
+    from dashboard import graphs
+    from simulation.sweep import KPI_NAMES, kpi_deltas
+    st.header("🧪 Parameter Sweep")
+    runs = results['sweep']
+    deltas = memoized(results, 'sweep_deltas', kpi_deltas, runs)
+    swept = [column for column in deltas.columns if column not in ('point', *KPI_NAMES) and deltas[column].nunique() > 1]
+    if not swept:
+        st.info("The sweep varied no parameter.")
+        return
+    cols = st.columns(3)
+    kpi_name = cols[0].selectbox("KPI", KPI_NAMES, index=KPI_NAMES.index('Average Delay'), key="sweep_kpi")
+    x = cols[1].selectbox("X Axis", swept, key="sweep_x")
+    y = cols[2].selectbox("Y Axis", swept, index=min(1, len(swept) - 1), key="sweep_y")
+    st.plotly_chart(memoized(results, ('sweep_heatmap', kpi_name, x, y), graphs.create_sweep_heatmap, deltas, x, y, kpi_name),
+                    use_container_width=True, key="sweep_heatmap")
+    st.caption(f"{len(deltas)} points, {len(runs)} runs")
+    st.dataframe(runs, use_container_width=True, hide_index=True)
+
+
+def memoized(results, key, build, *args):
+    """
+    build(*args), computed the first time a results page needs it and kept with the results in
+    session_state. Each simulation run gets a fresh results dict (and run_id), so cached KPIs,
+    figures and exports are reused across widget reruns but never across runs.
+    """
+    derived = results.setdefault('derived', {})
+    if key not in derived:
+        derived[key] = build(*args)
+    return derived[key]
+
+
+def run_kpis(run, config):
+    return kpi.calculate_kpis(run['logs'], config['num_trains'], 24, stop_platforms(config))
+
+
+def export_csv(log_df):
+    return log_df.to_csv(index=False).encode('utf-8')
+
+
+def export_parquet(log_df):
+    buffer = io.BytesIO()
+    log_df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None or importlib.util.find_spec('fastparquet') is not None
+
+
 def display_main_dashboard(results, config):
     """The main function to render the dashboard layout after simulation."""
-    log_df_non_ai = results['non_ai']['logs']
-    log_df_ai = results['ai']['logs']
+    from dashboard import graphs # plotly is only imported once there are results to chart
+    config = results.get('config', config) # The settings the results were simulated with, not the sidebar's now
     alerts_ai = results['ai']['alerts']
     decisions = results['ai']['decisions']
     
-    kpis_non_ai = kpi.calculate_kpis(log_df_non_ai, config['num_trains'], 24, config['platforms_b'])
-    kpis_ai = kpi.calculate_kpis(log_df_ai, config['num_trains'], 24, config['platforms_b'])
+    # Computed once per run (app.main already stores them), then reused on every rerun
+    kpis_non_ai = results['non_ai'].get('kpis') or memoized(results, 'kpis_non_ai', run_kpis, results['non_ai'], config)
+    kpis_ai = dict(results['ai'].get('kpis') or memoized(results, 'kpis_ai', run_kpis, results['ai'], config))
+
+    if results.get('from_cache'):
+        st.info(f"💾 Loaded from the scenario cache: seed {config.get('seed')} of this config was already simulated with the current models.")
 
     # --- NEW: EXECUTIVE SUMMARY SECTION ---
     st.header("🏆 Executive Summary")
@@ -117,13 +249,25 @@ def display_main_dashboard(results, config):
     tab1, tab2, tab3, tab4 = st.tabs(["⚡ Energy", "Throughput", "Average Delay", "Max Delay"])
     # ... (graphing code remains the same)
     with tab1:
-        st.plotly_chart(graphs.create_comparison_bar_chart(kpis_ai, kpis_non_ai, 'Total Energy'), use_container_width=True, key="energy_chart")
+        st.plotly_chart(memoized(results, 'energy_chart', graphs.create_comparison_bar_chart, kpis_ai, kpis_non_ai, 'Total Energy'), use_container_width=True, key="energy_chart")
     with tab2:
-        st.plotly_chart(graphs.create_comparison_bar_chart(kpis_ai, kpis_non_ai, 'Throughput'), use_container_width=True, key="throughput_chart")
+        st.plotly_chart(memoized(results, 'throughput_chart', graphs.create_comparison_bar_chart, kpis_ai, kpis_non_ai, 'Throughput'), use_container_width=True, key="throughput_chart")
     with tab3:
-        st.plotly_chart(graphs.create_comparison_bar_chart(kpis_ai, kpis_non_ai, 'Average Delay'), use_container_width=True, key="delay_chart")
+        st.plotly_chart(memoized(results, 'delay_chart', graphs.create_comparison_bar_chart, kpis_ai, kpis_non_ai, 'Average Delay'), use_container_width=True, key="delay_chart")
     with tab4:
-        st.plotly_chart(graphs.create_comparison_bar_chart(kpis_ai, kpis_non_ai, 'Max Delay'), use_container_width=True, key="max_delay_chart")
+        st.plotly_chart(memoized(results, 'max_delay_chart', graphs.create_comparison_bar_chart, kpis_ai, kpis_non_ai, 'Max Delay'), use_container_width=True, key="max_delay_chart")
+
+    st.markdown("---")
+    st.header("🚆 Train Timelines")
+    # One interval table per run feeds all three views
+    intervals = {name: memoized(results, ('intervals', name), TrainIntervals, results[name]['logs']) for name in ('non_ai', 'ai')}
+    st.plotly_chart(memoized(results, 'cumulative_delay_chart', graphs.create_delay_line_chart, intervals['ai'], intervals['non_ai']),
+                    use_container_width=True, key="cumulative_delay_chart")
+    for tab, name in zip(st.tabs(["Baseline (Non-AI)", "Optimized (AI-Powered)"]), ('non_ai', 'ai')):
+        with tab:
+            st.plotly_chart(memoized(results, ('gantt', name), graphs.create_train_animation, intervals[name]), use_container_width=True, key=f"gantt_{name}")
+            st.dataframe(memoized(results, ('train_summary', name), tables.generate_train_summary_df, intervals[name], config),
+                         use_container_width=True, hide_index=True)
         
     st.markdown("---")
     st.header("🤖 AI Interventions & Alerts")
@@ -138,10 +282,16 @@ def display_main_dashboard(results, config):
     if not decisions:
         st.info("No major AI decisions were logged.")
     else:
-        # Sort decisions by type to group them nicely
-        sorted_decisions = sorted(decisions, key=lambda x: x.get('type', ''))
+        # Sort decisions by type to group them nicely, and show them a page at a time
+        sorted_decisions = memoized(results, 'sorted_decisions', lambda: sorted(decisions, key=lambda x: x.get('type', '')))
+        pages = -(-len(sorted_decisions) // DECISIONS_PER_PAGE)
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", 1, pages, 1, key=f"decision_page_{results.get('run_id')}")
+        first = (page - 1) * DECISIONS_PER_PAGE
+        st.caption(f"Decisions {first + 1}-{min(first + DECISIONS_PER_PAGE, len(sorted_decisions))} of {len(sorted_decisions)}")
         
-        for d in sorted_decisions:
+        for d in sorted_decisions[first:first + DECISIONS_PER_PAGE]:
             decision_type = d.get('type', 'General')
             color = {"Intervention": "orange", "Energy": "blue", "Allocation": "green"}.get(decision_type, "gray")
 
@@ -155,23 +305,37 @@ def display_main_dashboard(results, config):
                     data_str = " | ".join([f"**{key}:** {value}" for key, value in d['data_used'].items()])
                     st.markdown(f"> {data_str}")
     
+    if results.get('replications') is not None:
+        st.markdown("---")
+        display_replication_summary(results['replications'])
+
+    if results.get('horizon') is not None:
+        st.markdown("---")
+        display_horizon_summary(results['horizon'])
+
+    if 'planned_kpis' in results['ai']:
+        st.markdown("---")
+        display_what_if_impact(results, config)
+
+    if results.get('sweep') is not None:
+        st.markdown("---")
+        display_sweep_summary(results)
+
     # --- NEW: EXPORT RESULTS SECTION ---
     st.markdown("---")
     st.header("📁 Download Simulation Logs")
+    formats = [('csv', export_csv, 'text/csv')]
+    if parquet_available():
+        formats.append(('parquet', export_parquet, 'application/octet-stream'))
     export_cols = st.columns(2)
-    with export_cols[0]:
-        st.download_button(
-            label="Download Baseline Logs (.csv)",
-            data=log_df_non_ai.to_csv(index=False).encode('utf-8'),
-            file_name='baseline_simulation_logs.csv',
-            mime='text/csv',
-            use_container_width=True
-        )
-    with export_cols[1]:
-        st.download_button(
-            label="Download AI-Powered Logs (.csv)",
-            data=log_df_ai.to_csv(index=False).encode('utf-8'),
-            file_name='ai_simulation_logs.csv',
-            mime='text/csv',
-            use_container_width=True
-        )
\ No newline at end of file
+    for column, name, label, file_prefix in zip(export_cols, ('non_ai', 'ai'), ("Baseline", "AI-Powered"), ('baseline', 'ai')):
+        with column:
+            for extension, export, mime in formats:
+                st.download_button(
+                    label=f"Download {label} Logs (.{extension})",
+                    data=memoized(results, (extension, name), export, results[name]['logs']),
+                    file_name=f'{file_prefix}_simulation_logs.{extension}',
+                    mime=mime,
+                    use_container_width=True,
+                    key=f"download_{name}_{extension}"
+                )
\ No newline at end of file
@@ -1,8 +1,17 @@
-from ai.features import extract_features
+from ai.features import extract_feature_row, FEATURES, FEATURE_INDEX
+from simulation.controller import Decision
+from simulation.events import NO_BLOCK
+import numpy as np
 import random
 
+B_COUNT = FEATURE_INDEX['num_trains_at_station_B']
+BLOCK_FREE = FEATURE_INDEX['downstream_block_free']
+STOP_DURATION = FEATURE_INDEX['stop_duration_B']
+PRIORITY = FEATURE_INDEX['train_priority']
+BATCH_INFERENCE = True # Whether drive-mode requests at the same instant are scored in one batch, unless configured
+
 class AIController:
-    def __init__(self, env, stations, blocks, ai_manager, disaster_mode):
+    def __init__(self, env, stations, blocks, ai_manager, disaster_mode, batch_inference=BATCH_INFERENCE, rng=random):
         self.env = env
         self.stations = stations
         self.blocks = blocks
@@ -11,40 +20,158 @@ class AIController:
         self.platform_allocations = {}
         self.alerts = []
         self.decision_logs = []
+        self.rng = rng # Source of the random hold times
+
+        # Preallocated feature buffers: one row for per-call decisions, a growable
+        # matrix for drive-mode requests queued at the same env.now
+        self.batch_inference = batch_inference
+        self._row = np.empty(len(FEATURES))
+        self._batch = np.empty((16, len(FEATURES)))
+        self._pending = []
+        self._flush_event = None
+
+        # Shared part of the feature row per (previous, focus, downstream) anchors, valid for
+        # the current hour until a platform or block changes occupancy; see _feature_row
+        self._snapshots = {}
+        self._snapshot_hour = None
+        for resource in [station.platforms for station in stations] + list(blocks):
+            resource.watchers.append(self._on_resource_change)
+        # Model outputs per feature row (all features are small integers, so rows repeat)
+        self._delay_memo = {}
+        self._platform_memo = {}
+        self._drive_mode_memo = {}
+
+    def _on_resource_change(self, resource):
+        self._snapshots.clear()
+
+    def _feature_row(self, train, out):
+        """
+        Writes the train's features into `out`. Time, occupancy and block state are shared by
+        every train looking at the same stations, so they come from a snapshot taken once per
+        state change; only the train's own stop duration and priority are patched in.
+        """
+        hour = self.env.now // 60
+        if hour != self._snapshot_hour:
+            self._snapshots.clear()
+            self._snapshot_hour = hour
+        shared = self._snapshots.get(train.anchors)
+        if shared is None:
+            shared = self._snapshots[train.anchors] = extract_feature_row(self.env, self.stations, self.blocks, train, self.disaster_mode)
+        out[:] = shared
+        out[STOP_DURATION] = train.stop_duration
+        out[PRIORITY] = train.priority
+        return out
+
+    def _predict_delay(self, row):
+        key = row.tobytes()
+        if key not in self._delay_memo:
+            self._delay_memo[key] = self.ai_manager.predict_delay(row)
+        return self._delay_memo[key]
+
+    def _predict_platform(self, row, n_platforms):
+        key = (row.tobytes(), n_platforms)
+        if key not in self._platform_memo:
+            self._platform_memo[key] = self.ai_manager.predict_platform(row, n_platforms)
+        return self._platform_memo[key]
+
+    def _predict_drive_mode(self, row):
+        key = row.tobytes()
+        if key not in self._drive_mode_memo:
+            self._drive_mode_memo[key] = self.ai_manager.predict_drive_mode(row)
+        return self._drive_mode_memo[key]
+
+    def _predict_drive_modes(self, rows):
+        """Drive-mode codes for a matrix of rows; only rows not seen before go to the model."""
+        memo = self._drive_mode_memo
+        keys = [row.tobytes() for row in rows]
+        missing = [i for i, key in enumerate(keys) if key not in memo]
+        if missing:
+            for i, mode_code in zip(missing, self.ai_manager.predict_drive_mode_batch(rows[missing])):
+                memo[keys[i]] = mode_code
+        return [memo[key] for key in keys]
+
+    def drive_mode_inputs(self, train):
+        """Resources whose occupancy the train's features read, and whether the clock matters (it does)."""
+        previous, focus, downstream = train.anchors
+        resources = [self.stations[previous].platforms, self.stations[focus].platforms]
+        if downstream != NO_BLOCK:
+            resources.append(self.blocks[downstream])
+        return resources, True
 
     def get_drive_mode(self, train):
         """Asks the AI model for the best drive mode and logs the decision."""
-        features_df = extract_features(self.env, self.stations, self.blocks, train, self.disaster_mode)
-        mode_code = self.ai_manager.predict_drive_mode(features_df)
-        drive_mode = "Eco-Coast" if mode_code == 2 else "Full Speed"
-        
-        if drive_mode == "Eco-Coast":
-            reason = "AI predicts upcoming congestion; switching to Eco-Coast to save energy."
-            data_used = {
-                'Trains at B': features_df['num_trains_at_station_B'].iloc[0],
-                'Downstream Free': 'Yes' if features_df['downstream_block_free'].iloc[0] == 1 else 'No'
+        decision = self._decide_drive_mode(train)
+        self.record_drive_mode(train, decision, self.env.now)
+        return decision.value
+
+    def request_drive_mode(self, train):
+        """
+        Returns a Decision for the train's drive mode; it is logged by record_drive_mode once
+        the train acts on it. In batch mode the features are captured now and the value is
+        filled in by a single vectorized predict once every train deciding at this env.now
+        has queued; `decision.ready` fires once it is set.
+        """
+        if not self.batch_inference:
+            return self._decide_drive_mode(train)
+
+        n = len(self._pending)
+        if n == len(self._batch):
+            self._batch = np.concatenate([self._batch, np.empty_like(self._batch)])
+        self._feature_row(train, self._batch[n])
+
+        if n == 0:
+            self._flush_event = self.env.timeout(0)
+            self._flush_event.callbacks.append(self._flush_drive_modes)
+        decision = Decision(ready=self._flush_event)
+        self._pending.append((train, decision))
+        return decision
+
+    def _flush_drive_modes(self, event):
+        pending, self._pending = self._pending, []
+        rows = self._batch[:len(pending)]
+        mode_codes = self._predict_drive_modes(rows)
+        for (train, decision), mode_code, row in zip(pending, mode_codes, rows):
+            self._fill_decision(decision, mode_code, row, train)
+
+    def _decide_drive_mode(self, train):
+        row = self._feature_row(train, self._row)
+        return self._fill_decision(Decision(), self._predict_drive_mode(row), row, train)
+
+    def _fill_decision(self, decision, mode_code, row, train):
+        decision.value = "Eco-Coast" if mode_code == 2 else "Full Speed"
+        if decision.value == "Eco-Coast":
+            decision.info = {
+                f'Trains at {self.stations[train.anchors[1]].name}': int(row[B_COUNT]),
+                'Downstream Free': 'Yes' if row[BLOCK_FREE] == 1 else 'No'
             }
+        return decision
+
+    def record_drive_mode(self, train, decision, time):
+        if decision.value == "Eco-Coast":
+            reason = "AI predicts upcoming congestion; switching to Eco-Coast to save energy."
             self.decision_logs.append({
-                "time": self.env.now, "train_id": train.train_id,
+                "time": time, "train_id": train.train_id,
                 "action": "Switched to Eco-Coast mode", "reason": reason,
-                "type": "Energy", "data_used": data_used
+                "type": "Energy", "data_used": decision.info
             })
-        return drive_mode
 
-    def request_platform(self, train, station_name):
+    # Platform and pass-through decisions stay per-call: each one can change the station
+    # occupancy that the next request at the same instant sees.
+    def request_platform(self, train, station):
+        station = self.stations[station]
         def _get_platform_process():
-            features_df = extract_features(self.env, self.stations, self.blocks, train, self.disaster_mode)
-            predicted_delay = self.ai_manager.predict_delay(features_df)
-            predicted_platform = self.ai_manager.predict_platform(features_df)
+            row = self._feature_row(train, self._row)
+            predicted_delay = self._predict_delay(row)
+            predicted_platform = self._predict_platform(row, station.platforms.capacity)
             
             data_used = {
-                'Trains at B': features_df['num_trains_at_station_B'].iloc[0],
-                'Downstream Free': 'Yes' if features_df['downstream_block_free'].iloc[0] == 1 else 'No',
+                f'Trains at {station.name}': int(row[B_COUNT]),
+                'Downstream Free': 'Yes' if row[BLOCK_FREE] == 1 else 'No',
                 'Predicted Delay': f"{predicted_delay:.1f} min"
             }
 
             if predicted_delay > 15 and train.priority == 2:
-                hold_time = random.uniform(1, 5)
+                hold_time = self.rng.uniform(1, 5)
                 action = f"Held Local train for {hold_time:.1f} min"
                 reason = f"High predicted delay and downstream congestion detected."
                 self.alerts.append(f"⚠️ AI Intervention: {train.train_id} ({action}) to ease congestion.")
@@ -53,52 +180,52 @@ class AIController:
 
             action = f"Assigned to Platform {predicted_platform}"
             reason = f"AI model chose Platform {predicted_platform} as optimal for this Local train, considering current station and track occupancy."
-            self.alerts.append(f"✅ AI Decision: {train.train_id} -> P{predicted_platform} @ {station_name}")
+            self.alerts.append(f"✅ AI Decision: {train.train_id} -> P{predicted_platform} @ {station.name}")
             self.decision_logs.append({"time": self.env.now, "train_id": train.train_id, "action": action, "reason": reason, "type": "Allocation", "data_used": data_used})
 
-            req = self.stations[station_name].platforms.request()
+            req = station.platforms.request()
             self.platform_allocations[train.train_id] = (req, predicted_platform)
             yield req
             return predicted_platform
         
         return self.env.process(_get_platform_process())
         
-    def request_pass_through(self, train, station_name):
+    def request_pass_through(self, train, station):
+        station = self.stations[station]
         def _pass_through_process():
-            features_df = extract_features(self.env, self.stations, self.blocks, train, self.disaster_mode)
-            num_at_b = features_df['num_trains_at_station_B'].iloc[0]
-            downstream_free = features_df['downstream_block_free'].iloc[0]
+            row = self._feature_row(train, self._row)
+            num_at_b = int(row[B_COUNT])
+            downstream_free = row[BLOCK_FREE]
 
             data_used = {
-                'Trains at B': num_at_b,
+                f'Trains at {station.name}': num_at_b,
                 'Downstream Free': 'Yes' if downstream_free == 1 else 'No'
             }
 
-            if num_at_b >= self.stations[station_name].platforms.capacity or not downstream_free:
-                wait_time = random.uniform(2, 6)
+            if num_at_b >= station.platforms.capacity or not downstream_free:
+                wait_time = self.rng.uniform(2, 6)
                 action = f"Held Express train for {wait_time:.1f} min"
-                reason = "Station B is congested or downstream block is occupied. Holding to prevent gridlock."
+                reason = f"Station {station.name} is congested or downstream block is occupied. Holding to prevent gridlock."
                 self.alerts.append(f"⚠️ AI Intervention: {train.train_id} ({action}).")
                 self.decision_logs.append({"time": self.env.now, "train_id": train.train_id, "action": action, "reason": reason, "type": "Intervention", "data_used": data_used})
                 yield self.env.timeout(wait_time)
             else:
                 action = "Cleared for direct pass-through"
-                reason = "Station B and downstream track are clear, prioritizing Express train."
+                reason = f"Station {station.name} and downstream track are clear, prioritizing Express train."
                 self.decision_logs.append({"time": self.env.now, "train_id": train.train_id, "action": action, "reason": reason, "type": "Allocation", "data_used": data_used})
                 yield self.env.timeout(2)
 
         return self.env.process(_pass_through_process())
 
     # request_block, release_block, and release_platform remain the same
-    def request_block(self, train_id, block_name):
-        return self.blocks[block_name].request()
+    def request_block(self, train_id, block):
+        return self.blocks[block].request()
 
-    def release_block(self, block_name):
-        if self.blocks[block_name].users:
-            self.blocks[block_name].release(self.blocks[block_name].users[0])
+    def release_block(self, block, request):
+        self.blocks[block].release(request)
 
-    def release_platform(self, train, station_name, platform_id):
-        station = self.stations[station_name]
+    def release_platform(self, train, station, platform_id):
+        station = self.stations[station]
         if train.train_id in self.platform_allocations:
             req, _ = self.platform_allocations[train.train_id]
             station.platforms.release(req)
@@ -0,0 +1,119 @@
+"""
+What-if branches forked from a running simulation: the run is simulated once up to the
+fork time, and each branch then simulates only the rest of the horizon from that state.
+
+A SimPy environment is a web of live generators, which cannot be pickled or copied, so the
+snapshot is the process itself: after the shared prefix, os.fork() gives each branch a
+copy-on-write copy of the whole simulation (event queue, resource queues, trains, the
+controller with its decisions so far, and the random state). A branch applies its changes,
+runs to the end and sends its results back through a pipe. Without os.fork, each branch
+replays the prefix from t=0 with the same seed instead.
+
+A branch is a list of changes, callables applied to the environment at the fork time:
+
+    run_branches(config, 600, {'as planned': [], 'T17 breaks down': [Breakdown('T17', 30)]})
+"""
+import os
+import pickle
+import random
+import traceback
+from simulation.env import setup_simulation_environment, DAY
+from simulation.topology import stop_platforms
+from simulation.metrics import calculate_kpis
+
+PLANNED, WHAT_IF = 'planned', 'what_if'
+
+class Breakdown:
+    """A train losing `minutes` from the fork time on: on the line it holds its block that much
+    longer (see Train.hold), and if it has not departed yet, it departs that much later."""
+    def __init__(self, train_id, minutes):
+        self.train_id = train_id
+        self.minutes = minutes
+
+    def __call__(self, env):
+        for train in env.running.values():
+            if train.train_id == self.train_id:
+                train.hold(self.minutes)
+                return
+        env.delays[self.train_id] = env.delays.get(self.train_id, 0) + self.minutes
+
+def what_if_branches(config):
+    """
+    The sidebar's what-if as branches at config['what_if_at']: the prefix config without the
+    what-if delay, and the 'planned' and 'what_if' branches (the selected train breaking down).
+    """
+    prefix_config = {**config, 'what_if_train': None, 'what_if_delay': 0}
+    return prefix_config, {PLANNED: [], WHAT_IF: [Breakdown(config['what_if_train'], config['what_if_delay'])]}
+
+def _advance(env, until):
+    while not env.fleet.processed and env.peek() < until:
+        env.step()
+
+def _finish(env, controller, config, stop_time):
+    """Runs the environment to stop_time and returns the run's (log_df, alerts, decision_logs, kpis)."""
+    _advance(env, stop_time)
+    log_df = env.event_log.to_frame()
+    days = config.get('days', 1)
+    kpis = calculate_kpis(log_df, config['num_trains'] * days, 24 * days, stop_platforms(config))
+    return log_df, getattr(controller, 'alerts', []), getattr(controller, 'decision_logs', []), kpis
+
+def run_branches(config, at, branches, stop_time=None):
+    """
+    Simulates `config` to minute `at` once, then every branch of `branches` (a name mapped
+    to its changes) from there to stop_time, by default the end of the last day. Returns a
+    dict mapping each name to (log_df, alerts, decision_logs, kpis).
+    """
+    if stop_time is None:
+        stop_time = config.get('days', 1) * DAY
+    if not hasattr(os, 'fork'):
+        return _replay_branches(config, at, branches, stop_time)
+    env, controller = setup_simulation_environment(config, None)
+    _advance(env, at)
+
+    children = {}
+    for name, changes in branches.items():
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0: # The branch: everything up to `at` is shared with the parent until written to
+            os.close(read_fd)
+            try:
+                for change in changes:
+                    change(env)
+                result = (True, _finish(env, controller, config, stop_time))
+            except BaseException:
+                result = (False, traceback.format_exc())
+            try:
+                with os.fdopen(write_fd, 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        children[name] = (pid, read_fd)
+
+    results, errors = {}, {}
+    for name, (pid, read_fd) in children.items():
+        # Read before waiting: a branch blocks on a full pipe until its results are taken
+        with os.fdopen(read_fd, 'rb') as f:
+            try:
+                ok, result = pickle.load(f)
+            except EOFError:
+                ok, result = False, "The branch process exited without results."
+        os.waitpid(pid, 0)
+        (results if ok else errors)[name] = result
+    if errors:
+        name, error = next(iter(errors.items()))
+        raise RuntimeError(f"What-if branch {name!r} failed:\n{error}")
+    return results
+
+def _replay_branches(config, at, branches, stop_time):
+    """run_branches without os.fork: each branch reruns the prefix, so all of them share a seed."""
+    if config.get('rng') is None and config.get('seed') is None:
+        config = {**config, 'seed': random.randrange(2**31)}
+    results = {}
+    for name, changes in branches.items():
+        env, controller = setup_simulation_environment(config, None)
+        _advance(env, at)
+        for change in changes:
+            change(env)
+        results[name] = _finish(env, controller, config, stop_time)
+    return results
\ No newline at end of file
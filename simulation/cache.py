@@ -0,0 +1,81 @@
+"""
+Persistent cache of finished scenario runs: re-running a seeded config loads its results
+instead of simulating again.
+
+Entries are keyed by a hash of the config (less the settings that don't change results),
+its seed and the model artifact the AI run used, and hold the gzip-compressed pickle of
+the results: logs, KPIs, alerts and decision logs. Once the directory grows past its size
+budget, the least recently used entries are evicted.
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_VERSION = 1 # Bump when a simulation change makes cached results stale
+# Settings that change how a run is shown or how fast it goes, not its results
+IGNORED_KEYS = ('live_updates', 'decision_table', 'replications', 'base_seed', 'use_cache', 'sweep', 'ai_manager')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+def model_version(ai_manager):
+    """The content hash of the artifact the AI's models were loaded from, or None without models."""
+    if ai_manager is None or ai_manager.artifact_dir is None:
+        return None
+    return os.path.basename(ai_manager.artifact_dir)
+
+def scenario_key(config, model=None):
+    """Hash of a config (including its seed) and the model version its AI run uses."""
+    normalized = {k: v for k, v in config.items() if k not in IGNORED_KEYS}
+    payload = json.dumps({'config': normalized, 'model': model, 'version': CACHE_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ScenarioCache:
+    def __init__(self, directory='data/scenario_cache', max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl.gz")
+
+    def get(self, key):
+        """The results stored under `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rb') as f:
+                results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path) # Marks the entry as recently used
+        return results
+
+    def put(self, key, results):
+        """Stores `results` under `key`, then evicts the least recently used entries over budget."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with gzip.open(tmp_path, 'wb', compresslevel=COMPRESS_LEVEL) as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        # Other sessions may evict at the same time, so an entry can vanish at any point here
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl.gz'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.directory, name)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Headless batch runner: simulates scenarios from JSON or YAML files without the Streamlit UI.
+
+    python -m simulation.cli scenarios.yaml --out results/ --workers 4 --format parquet
+
+A scenario file holds one scenario, a list of them, or {"scenarios": [...]}. Each scenario
+is a config as built by the sidebar (num_trains, platforms_a/b/c, disaster_mode, ...) plus
+optional `name`, `seed`, `days`, `stop_time`, `topology` (a topology file, see
+simulation.topology), `decision_table` (AI runs look decisions up in ai.lookup's table) and
+`controllers` (default: both "baseline" and "ai"). Every run writes <name>_<controller>_logs
+and all KPIs go to one kpis table in --out.
+
+With --window, runs are long-horizon instead: the timetable recurs for `days` days, KPIs are
+aggregated per window into <name>_<controller>_windows and no full log is kept in memory
+(--spill also writes the raw events to <name>_<controller>_events/).
+
+With --sweep, each scenario is instead the base of a parameter sweep (see simulation.sweep):
+every run goes to <name>_sweep and the AI-minus-baseline KPIs per point to <name>_sweep_deltas.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import as_completed
+import pandas as pd
+from ai.model import AIManager
+from simulation.env import run_simulation
+from simulation.progress import NullProgress, LoggingProgress
+from simulation.horizon import run_long_simulation
+from simulation.parallel import make_pool, simulate, simulate_horizon
+from simulation.sweep import grid_points, latin_hypercube_points, run_sweep, kpi_deltas
+from simulation.topology import stop_platforms
+from simulation.metrics import calculate_kpis
+
+CONTROLLERS = {'baseline': False, 'ai': True}
+DEFAULTS = {
+    'platforms_a': 2, 'platforms_b': 2, 'platforms_c': 2, 'disaster_mode': False,
+    'what_if_train': None, 'what_if_delay': 0, 'travel_time_ab': 60, 'travel_time_bc': 50
+}
+
+logger = logging.getLogger('simulation')
+
+def read_file(path):
+    """Parses a .json, .yaml or .yml file."""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml # Only needed for YAML scenario files
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def load_scenarios(path):
+    """Reads scenario configs from a .json, .yaml or .yml file."""
+    data = read_file(path)
+    if isinstance(data, dict):
+        data = data.get('scenarios', [data])
+
+    scenarios = []
+    for i, scenario in enumerate(data):
+        scenario = {**DEFAULTS, **scenario}
+        scenario.setdefault('name', f"{os.path.splitext(os.path.basename(path))[0]}_{i}")
+        if 'num_trains' not in scenario:
+            raise ValueError(f"Scenario {scenario['name']} in {path} has no num_trains")
+        scenarios.append(scenario)
+    return scenarios
+
+def expand_runs(scenarios):
+    """One run config per scenario and controller."""
+    runs = []
+    for scenario in scenarios:
+        for controller in scenario.get('controllers', list(CONTROLLERS)):
+            if controller not in CONTROLLERS:
+                raise ValueError(f"Unknown controller {controller!r} in scenario {scenario['name']}")
+            config = {k: v for k, v in scenario.items() if k not in ('name', 'controllers')}
+            runs.append(((scenario['name'], controller), {**config, 'is_ai_controlled': CONTROLLERS[controller], 'ai_manager': None}))
+    return runs
+
+def run_sequential(runs, ai_manager, quiet=False):
+    for (name, controller), config in runs:
+        if config['is_ai_controlled']:
+            config = {**config, 'ai_manager': ai_manager}
+        progress = NullProgress() if quiet else LoggingProgress(f"{name}/{controller}")
+        log_df, alerts, sim_controller = run_simulation(config, progress, config.get('stop_time'))
+        days = config.get('days', 1)
+        kpis = calculate_kpis(log_df, config['num_trains'] * days, 24 * days, stop_platforms(config))
+        yield (name, controller), log_df, alerts, getattr(sim_controller, 'decision_logs', []), kpis
+
+def run_parallel(runs, ai_manager, workers):
+    with make_pool(ai_manager, workers) as pool:
+        futures = [pool.submit(simulate, key, config) for key, config in runs]
+        for future in as_completed(futures):
+            yield future.result()
+
+def spill_dir(out, key, spill):
+    return os.path.join(out, f"{key[0]}_{key[1]}_events") if spill else None
+
+def run_horizons(runs, ai_manager, workers, window, out, spill=False, quiet=False):
+    """Long-horizon runs, yielding (key, windows_df, alerts) as each finishes."""
+    if workers > 1:
+        with make_pool(ai_manager, workers) as pool:
+            futures = [pool.submit(simulate_horizon, key, config, window, spill_dir(out, key, spill)) for key, config in runs]
+            for future in as_completed(futures):
+                yield future.result()
+        return
+    for key, config in runs:
+        if config['is_ai_controlled']:
+            config = {**config, 'ai_manager': ai_manager}
+        progress = NullProgress() if quiet else LoggingProgress('/'.join(key))
+        windows_df, alerts, _ = run_long_simulation(config, window, spill_dir=spill_dir(out, key, spill), progress_bar=progress)
+        yield key, windows_df, alerts
+
+def write_table(df, path_stem, fmt):
+    path = f"{path_stem}.{fmt}"
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run train traffic simulations without the UI.")
+    parser.add_argument('scenarios', nargs='+', help='JSON or YAML scenario files')
+    parser.add_argument('--out', default='results', help='output directory')
+    parser.add_argument('--format', choices=['parquet', 'csv'],
+                        default='parquet' if importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet') else 'csv')
+    parser.add_argument('--workers', type=int, default=1, help='processes to run scenarios in (1 runs them in sequence)')
+    parser.add_argument('--seed', type=int, help='seed for runs whose scenario sets none')
+    parser.add_argument('--data', default='data/historical.csv', help='historical data the AI models are trained on')
+    parser.add_argument('--quiet', action='store_true', help='no progress logging')
+    parser.add_argument('--window', type=int, help='long-horizon mode: aggregate KPIs per this many simulated minutes')
+    parser.add_argument('--spill', action='store_true', help='with --window, also write every raw event to disk')
+    parser.add_argument('--sweep', help='sweep mode: JSON or YAML file mapping parameters to the values to run each scenario with')
+    parser.add_argument('--samples', type=int, default=0, help='with --sweep, a Latin-hypercube sample of this many points instead of the full grid')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format='%(asctime)s %(message)s')
+    scenarios = [scenario for path in args.scenarios for scenario in load_scenarios(path)]
+    if args.seed is not None:
+        for scenario in scenarios:
+            scenario.setdefault('seed', args.seed)
+        random.seed(args.seed)
+    runs = expand_runs(scenarios)
+
+    ai_manager = None
+    if args.sweep or any(config['is_ai_controlled'] for _, config in runs):
+        ai_manager = AIManager(args.data)
+        ai_manager.load_or_train()
+
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    if args.sweep:
+        space = read_file(args.sweep)
+        sweep_tables = []
+        for scenario in scenarios:
+            base_config = {k: v for k, v in scenario.items() if k not in ('name', 'controllers', 'seed')}
+            seed = scenario.get('seed', 0)
+            points = latin_hypercube_points(space, args.samples, seed) if args.samples else grid_points(space)
+            runs_df = run_sweep(base_config, points, seed, ai_manager, args.workers)
+            path = write_table(runs_df, os.path.join(args.out, f"{scenario['name']}_sweep"), args.format)
+            write_table(kpi_deltas(runs_df), os.path.join(args.out, f"{scenario['name']}_sweep_deltas"), args.format)
+            sweep_tables.append(runs_df.assign(scenario=scenario['name']))
+            logger.info("%s sweep done: %d points -> %s", scenario['name'], len(points), path)
+        logger.info("%d sweep runs in %.1fs", sum(map(len, sweep_tables)), time.perf_counter() - start)
+        return pd.concat(sweep_tables, ignore_index=True)
+
+    if args.window:
+        window_tables = []
+        for (name, controller), windows_df, alerts in run_horizons(runs, ai_manager, args.workers, args.window, args.out, args.spill, args.quiet):
+            path = write_table(windows_df, os.path.join(args.out, f"{name}_{controller}_windows"), args.format)
+            window_tables.append(windows_df.assign(scenario=name, controller=controller))
+            logger.info("%s/%s done: %d windows -> %s", name, controller, len(windows_df), path)
+        logger.info("%d runs in %.1fs", len(window_tables), time.perf_counter() - start)
+        return pd.concat(window_tables, ignore_index=True)
+
+    results = run_parallel(runs, ai_manager, args.workers) if args.workers > 1 else run_sequential(runs, ai_manager, args.quiet)
+    kpi_rows = []
+    for (name, controller), log_df, alerts, decision_logs, kpis in results:
+        path = write_table(log_df, os.path.join(args.out, f"{name}_{controller}_logs"), args.format)
+        kpi_rows.append({'scenario': name, 'controller': controller, **{k: float(v) for k, v in kpis.items()},
+                         'alerts': len(alerts), 'decisions': len(decision_logs)})
+        logger.info("%s/%s done: %d log rows -> %s", name, controller, len(log_df), path)
+
+    kpi_df = pd.DataFrame(kpi_rows).sort_values(['scenario', 'controller'], ignore_index=True)
+    path = write_table(kpi_df, os.path.join(args.out, 'kpis'), args.format)
+    logger.info("%d runs in %.1fs; KPIs -> %s", len(kpi_rows), time.perf_counter() - start, path)
+    return kpi_df
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,37 +1,60 @@
+from simulation.events import ANY_PLATFORM
+
+class Decision:
+    """A controller decision whose value may be filled in later, when `ready` fires."""
+    __slots__ = ('value', 'ready', 'info')
+
+    def __init__(self, value=None, ready=None, info=None):
+        self.value = value
+        self.ready = ready
+        self.info = info # Data used for the decision, kept for the decision log
+
+FULL_SPEED = Decision("Full Speed")
+
 class NonAIController:
+    """First-come, first-served control. Stations and blocks are lists indexed as in the topology."""
     def __init__(self, env, stations, blocks):
         self.env = env
         self.stations = stations
         self.blocks = blocks
         self.platform_allocations = {}
 
+    def drive_mode_inputs(self, train):
+        """The baseline drive mode reads no resources and not the clock."""
+        return [], False
+
     def get_drive_mode(self, train):
         """Baseline controller always runs at full speed."""
         return "Full Speed"
 
-    def request_block(self, train_id, block_name):
-        return self.blocks[block_name].request()
+    def request_drive_mode(self, train):
+        return FULL_SPEED
+
+    def record_drive_mode(self, train, decision, time):
+        pass
+
+    def request_block(self, train_id, block):
+        return self.blocks[block].request()
 
-    def release_block(self, block_name):
-        if self.blocks[block_name].users:
-            self.blocks[block_name].release(self.blocks[block_name].users[0])
+    def release_block(self, block, request):
+        self.blocks[block].release(request)
 
-    def request_platform(self, train, station_name):
-        station = self.stations[station_name]
+    def request_platform(self, train, station):
+        station = self.stations[station]
         req = station.platforms.request()
         self.platform_allocations[train.train_id] = req
         def get_platform_process():
             yield req
-            return "Any" 
+            return ANY_PLATFORM
         return self.env.process(get_platform_process())
 
-    def request_pass_through(self, train, station_name):
+    def request_pass_through(self, train, station):
         def _pass_through_process():
             yield self.env.timeout(2)
         return self.env.process(_pass_through_process())
 
-    def release_platform(self, train, station_name, platform_id=None):
-        station = self.stations[station_name]
+    def release_platform(self, train, station, platform_id=None):
+        station = self.stations[station]
         if train.train_id in self.platform_allocations:
             station.platforms.release(self.platform_allocations[train.train_id])
             del self.platform_allocations[train.train_id]
\ No newline at end of file
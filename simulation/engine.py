@@ -0,0 +1,66 @@
+from heapq import heappop, heappush
+import simpy
+from simpy.core import NORMAL, Infinity
+
+class TickEnvironment(simpy.Environment):
+    """
+    A simpy.Environment that also runs ticks: plain callbacks that take exactly the place in
+    the event order a Timeout created at the same moment would take (they draw from the same
+    event-id counter), without the cost of a SimPy event and a process resume.
+    """
+
+    def __init__(self, initial_time=0):
+        super().__init__(initial_time)
+        self._ticks = []
+        self.steps = 0 # Events and ticks processed so far
+
+    def reserve(self, delay):
+        """Reserves the queue position a Timeout(delay) created now would take."""
+        return (self._now + delay, NORMAL, next(self._eid))
+
+    def schedule_tick(self, slot, callback):
+        heappush(self._ticks, (*slot, callback))
+
+    def schedule_at(self, slot, event, value=None):
+        """Triggers a pending event in a reserved position, as if it were that Timeout."""
+        event._ok = True
+        event._value = value
+        heappush(self._queue, (*slot, event))
+
+    def peek(self):
+        if self._ticks and (not self._queue or self._ticks[0][:3] < self._queue[0][:3]):
+            return self._ticks[0][0]
+        return self._queue[0][0] if self._queue else Infinity
+
+    def step(self):
+        self.steps += 1
+        if self._ticks and (not self._queue or self._ticks[0][:3] < self._queue[0][:3]):
+            self._now, _, _, callback = heappop(self._ticks)
+            callback()
+        else:
+            super().step()
+
+class ObservableResource(simpy.Resource):
+    """A simpy.Resource that calls its watchers whenever its set of users changes."""
+
+    def __init__(self, env, capacity=1):
+        super().__init__(env, capacity=capacity)
+        self.watchers = []
+
+    def _do_put(self, event):
+        n_users = len(self.users)
+        result = super()._do_put(event)
+        if len(self.users) != n_users:
+            self._notify()
+        return result
+
+    def _do_get(self, event):
+        n_users = len(self.users)
+        result = super()._do_get(event)
+        if len(self.users) != n_users:
+            self._notify()
+        return result
+
+    def _notify(self):
+        for watcher in list(self.watchers):
+            watcher(self)
\ No newline at end of file
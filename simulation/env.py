@@ -1,75 +1,175 @@
-import simpy
 import random
-import pandas as pd
+import time
 from simulation.station import Station
-from simulation.train import Train
+from simulation.topology import topology_from_config, stop_platforms
+from simulation.engine import TickEnvironment, ObservableResource
+from simulation.events import EventLog
+from simulation.progress import NullProgress
+from simulation.metrics import KPIAccumulator
+from simulation.train import Train, TrainTable
 from simulation.controller import NonAIController
-from simulation.ai_controller import AIController
+from simulation.ai_controller import AIController, BATCH_INFERENCE
+
+DAY = 1440 # Simulated minutes per day
+STOP_DURATIONS = [0, 5, 10, 15] # Minutes a train may be scheduled to stop at each station
+
+def make_rng(config):
+    """
+    The random source for a run: config['rng'] if given, else a generator seeded with
+    config['seed'], else the shared `random` module (unseeded, as before).
+    """
+    if config.get('rng') is not None:
+        return config['rng']
+    if config.get('seed') is not None:
+        return random.Random(config['seed'])
+    return random
+
+def make_timetable(num_trains, seed=None, disaster_mode=False):
+    """
+    A day's (stop_duration, headway) for each train, drawn in the order generate_trains draws
+    them from a generator seeded with `seed`; in disaster mode there are no headways (None).
+    Runs given the same timetable (config['timetable']) see the same trains whatever else
+    their random source is used for, e.g. the AI's hold times.
+    """
+    rng = random.Random(seed)
+    timetable = []
+    for _ in range(num_trains):
+        stop_duration = rng.choice(STOP_DURATIONS) if num_trains > 1 else 10
+        timetable.append((stop_duration, None if disaster_mode else rng.uniform(5, 20)))
+    return timetable
 
 def setup_simulation_environment(config, trains_in_sim):
-    env = simpy.Environment()
-    
-    stations = {
-        'A': Station(env, 'A', config['platforms_a']),
-        'B': Station(env, 'B', config['platforms_b']),
-        'C': Station(env, 'C', config['platforms_c'])
-    }
+    env = TickEnvironment()
+    rng = make_rng(config)
+    env.topology = topology_from_config(config)
+    env.event_log = EventLog(env.topology.station_names, env.topology.block_names)
+    env.trains = TrainTable([env.topology.route()], capacity=max(config['num_trains'], 1))
+    env.delays = {} # Extra departure delays by train id, injected mid-run (see simulation.branching)
     
-    blocks = {
-        'Block_A_B': simpy.Resource(env, capacity=1),
-        'Block_B_C': simpy.Resource(env, capacity=1)
-    }
+    # Stations and blocks are lists, indexed like the topology's names
+    stations = [Station(env, name, platforms) for name, platforms in zip(env.topology.station_names, env.topology.platforms)]
+    blocks = [ObservableResource(env, capacity=capacity) for capacity in env.topology.block_capacities]
     
     if config['is_ai_controlled']:
-        controller = AIController(env, stations, blocks, config['ai_manager'], config['disaster_mode'])
+        ai_manager = config['ai_manager']
+        if config.get('decision_table') and ai_manager is not None:
+            # Predictions become lookups in a table precomputed over the feature grid
+            ai_manager = ai_manager.decision_table(max(env.topology.platforms)) or ai_manager
+        controller = AIController(env, stations, blocks, ai_manager, config['disaster_mode'],
+                                  batch_inference=config.get('batch_inference', BATCH_INFERENCE), rng=rng)
     else:
         controller = NonAIController(env, stations, blocks)
         
-    env.process(generate_trains(env, controller, config, trains_in_sim))
+    env.fleet = env.process(generate_trains(env, controller, config, trains_in_sim, rng))
     
     return env, controller
 
-def generate_trains(env, controller, config, trains_in_sim):
+def generate_trains(env, controller, config, trains_in_sim, rng=random):
+    """
+    Runs the timetable: trains leave the topology's origin for its destination, each with a
+    dwell time it keeps at every stop (0 for an express that passes through). With
+    config['days'] above 1 the timetable recurs daily: each day's num_trains start at that
+    day's midnight (or after the previous day's last departure, if later). If trains_in_sim
+    is None the trains are not kept, so finished ones can be freed; their static attributes
+    stay in env.trains.
+    """
     train_count = 0
-    stops_template = {
-        'A': {'name': 'A'},
-        'B': {'name': 'B', 'travel_time_from_prev': 60},
-        'C': {'name': 'C', 'travel_time_from_prev': 50}
-    }
-
-    for i in range(config['num_trains']):
-        train_count += 1
-        train_id = f"T{train_count:02d}"
-        stop_duration_b = random.choice([0, 5, 10, 15]) if config['num_trains'] > 1 else 10
-        stops = stops_template.copy()
-        stops['B']['stop_duration'] = stop_duration_b
-        
-        initial_delay = 0
-        if config['what_if_train'] == train_id:
-            initial_delay = config['what_if_delay']
-        
-        trains_in_sim.append(Train(env, train_id, controller, stops, initial_delay))
-        
-        if not config['disaster_mode']:
-            yield env.timeout(random.uniform(5, 20))
+    timetable = config.get('timetable') # Precomputed by make_timetable, or drawn as trains are created
+    running = env.running = {} # Trains still on their way by process, in creation order
 
-def run_simulation(config, progress_bar, stop_time=1440):
-    trains_in_sim = []
-    env, controller = setup_simulation_environment(config, trains_in_sim)
-    
-    for t in range(1, stop_time + 1):
-        env.run(until=t)
-        if t % 10 == 0:
-             progress_bar.progress(t / stop_time)
+    for day in range(config.get('days', 1)):
+        if env.now < day * DAY:
+            yield env.timeout(day * DAY - env.now)
+        for i in range(config['num_trains']):
+            train_count += 1
+            train_id = f"T{train_count:02d}"
+            if timetable is not None:
+                stop_duration, headway = timetable[i]
+            else:
+                stop_duration = rng.choice(STOP_DURATIONS) if config['num_trains'] > 1 else 10
+            
+            initial_delay = env.delays.get(train_id, 0)
+            if config['what_if_train'] == train_id:
+                initial_delay += config['what_if_delay']
+            
+            train = Train(env, env.trains.add(train_id, 0, stop_duration, initial_delay), controller)
+            running[train.action] = train
+            train.action.callbacks.append(lambda action: running.pop(action))
+            if trains_in_sim is not None:
+                trains_in_sim.append(train)
+            
+            if not config['disaster_mode']:
+                yield env.timeout(headway if timetable is not None else rng.uniform(5, 20))
+
+    # The process ends once every train has logged arrive_final
+    yield env.all_of(list(running))
+
+def run_simulation(config, progress_bar=None, stop_time=None, progress_interval=0.1):
+    """
+    Runs a simulation to the end and returns (log_df, alerts, controller). It stops at
+    stop_time, by default the end of the last of config['days'] (one unless set).
+    """
+    if stop_time is None:
+        stop_time = config.get('days', 1) * DAY
+    env, controller = setup_simulation_environment(config, None)
+    if progress_bar is None:
+        progress_bar = NullProgress()
+
+    # One pass over the event queue; the progress bar is updated at most every
+    # progress_interval seconds of wall time, and the run ends as soon as all trains arrived
+    next_report = time.perf_counter() + progress_interval
+    while not env.fleet.processed and env.peek() < stop_time:
+        env.step()
+        if time.perf_counter() >= next_report:
+            progress_bar.progress(env.now / stop_time)
+            next_report = time.perf_counter() + progress_interval
 
     progress_bar.progress(1.0)
 
-    all_logs = [log for train in trains_in_sim for log in train.log]
-    log_df = pd.DataFrame(all_logs)
+    log_df = env.event_log.to_frame()
     
     alerts = []
     if isinstance(controller, AIController):
         alerts = controller.alerts
 
     # Return the controller object along with logs and alerts
-    return log_df, alerts, controller
\ No newline at end of file
+    return log_df, alerts, controller
+
+def stream_simulation(config, every=60, stop_time=None):
+    """
+    Runs a simulation as a generator. Every `every` simulated minutes, and once more at the
+    end, it yields a dict with the time reached, the log rows recorded since the previous
+    update ('logs'), the KPIs so far ('kpis') and how much each changed ('kpi_deltas').
+    KPIs are kept up to date incrementally, so each update costs O(new events).
+
+    The generator returns the same (log_df, alerts, controller) as run_simulation.
+    """
+    if stop_time is None:
+        stop_time = config.get('days', 1) * DAY
+    env, controller = setup_simulation_environment(config, None)
+    days = config.get('days', 1)
+    accumulator = KPIAccumulator(config['num_trains'] * days, 24 * days, stop_platforms(config))
+    kpis = accumulator.kpis()
+
+    checkpoint = every
+    while True:
+        until = min(checkpoint, stop_time)
+        while not env.fleet.processed and env.peek() < until:
+            env.step()
+        done = env.fleet.processed or env.peek() >= stop_time
+
+        batch = accumulator.update(env.event_log)
+        previous, kpis = kpis, accumulator.kpis()
+        yield {
+            'time': env.now if done else until,
+            'done': done,
+            'logs': batch,
+            'kpis': kpis,
+            'kpi_deltas': {name: kpis[name] - previous[name] for name in kpis}
+        }
+        if done:
+            break
+        checkpoint += every
+
+    alerts = controller.alerts if isinstance(controller, AIController) else []
+    return env.event_log.to_frame(), alerts, controller
\ No newline at end of file
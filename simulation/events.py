@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Event codes, in the order trains log them
+EVENTS = [
+    'start_delayed', 'depart', 'travel_start', 'travel_end', 'arrive_station',
+    'at_platform', 'depart_station', 'pass_through', 'arrive_final', 'final_energy'
+]
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+
+# Details text per event, rendered from the typed payload only when the log is handed over
+DETAILS = {
+    'start_delayed': "Starts with {value} min delay",
+    'depart': "Departed from Station {station}",
+    'travel_start': "Traveling on {block}",
+    'travel_end': "Finished travel on {block}",
+    'arrive_station': "Arrived at vicinity of Station {station}",
+    'at_platform': "Docked at Station {station} Platform {platform}",
+    'depart_station': "Departed from Station {station}",
+    'pass_through': "Passing through Station {station}",
+    'arrive_final': "Arrived at final destination Station {station}",
+    'final_energy': "Total energy consumed: {value:.0f} units"
+}
+
+NO_BLOCK = -1
+NO_STATION = -1
+NO_PLATFORM = -1
+ANY_PLATFORM = 0 # Docked without a platform number (the baseline controller)
+
+def _number(value):
+    return int(value) if value.is_integer() else value
+
+class EventLog:
+    """
+    Columnar event recorder shared by all trains of a simulation.
+
+    Each event is one row of preallocated NumPy columns: float64 time, the train's index,
+    an event code and numeric payload (block and station indices into the topology's names,
+    a platform number and a value, which is the delay for start_delayed, the scheduled run
+    time for depart and the energy for final_energy). Columns double in size when full.
+
+    Long runs can clear() the rows once they are folded into aggregates and release_trains()
+    that have finished, whose indices are then handed to new trains, so neither the rows nor
+    the train table grow with the horizon.
+    """
+
+    def __init__(self, stations=(), blocks=(), capacity=1024):
+        self.train_ids = []
+        self._free = [] # Released train indices, reused by add_train
+        self.stations = list(stations)
+        self.blocks = list(blocks)
+        self.size = 0
+        self.time = np.empty(capacity)
+        self.train = np.empty(capacity, dtype=np.int32)
+        self.event = np.empty(capacity, dtype=np.int8)
+        self.block = np.empty(capacity, dtype=np.int16)
+        self.station = np.empty(capacity, dtype=np.int16)
+        self.platform = np.empty(capacity, dtype=np.int16)
+        self.value = np.empty(capacity)
+
+    def add_train(self, train_id):
+        """Registers a train and returns the index its events are recorded under."""
+        if self._free:
+            index = self._free.pop()
+            self.train_ids[index] = train_id
+            return index
+        self.train_ids.append(train_id)
+        return len(self.train_ids) - 1
+
+    def release_trains(self, indices):
+        """Frees finished trains' indices; only call this once none of their rows are left."""
+        self._free.extend(int(index) for index in indices)
+
+    def clear(self):
+        """Drops every recorded row, keeping the allocated columns."""
+        self.size = 0
+
+    def record(self, time, train, event, block=NO_BLOCK, station=NO_STATION, platform=NO_PLATFORM, value=np.nan):
+        n = self.size
+        if n == len(self.time):
+            self._grow()
+        self.time[n] = time
+        self.train[n] = train
+        self.event[n] = event
+        self.block[n] = block
+        self.station[n] = station
+        self.platform[n] = platform
+        self.value[n] = value
+        self.size = n + 1
+
+    def _grow(self):
+        for column in ('time', 'train', 'event', 'block', 'station', 'platform', 'value'):
+            array = getattr(self, column)
+            setattr(self, column, np.concatenate([array, np.empty_like(array)]))
+
+    def details(self, start=0, end=None):
+        """Renders the details text, once per distinct (event, block, station, platform, value)."""
+        rows = slice(start, self.size if end is None else end)
+        keys = np.rec.fromarrays([self.event[rows], self.block[rows], self.station[rows], self.platform[rows], np.nan_to_num(self.value[rows])])
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        rendered = [
+            DETAILS[EVENTS[event]].format(
+                block=self.blocks[block] if block != NO_BLOCK else '',
+                station=self.stations[station] if station != NO_STATION else '',
+                platform=platform if platform != ANY_PLATFORM else 'Any',
+                value=_number(float(value)))
+            for event, block, station, platform, value in unique_keys.tolist()
+        ]
+        categories, codes = np.unique(np.array(rendered, dtype=object), return_inverse=True)
+        return pd.Categorical.from_codes(codes[inverse.ravel()], categories=categories)
+
+    def to_frame(self, start=0, end=None):
+        """
+        The log (or rows start:end of it) as a DataFrame in recording (time) order. Numeric
+        columns are views of the recorder's arrays; train_id, event, block, station and
+        details are categoricals.
+        """
+        rows = slice(start, self.size if end is None else end)
+        frame = pd.DataFrame({
+            'time': self.time[rows],
+            'train_id': pd.Categorical.from_codes(self.train[rows], categories=self.train_ids),
+            'event': pd.Categorical.from_codes(self.event[rows], categories=EVENTS),
+            'details': self.details(start, end),
+            'block': pd.Categorical.from_codes(self.block[rows], categories=self.blocks),
+            'station': pd.Categorical.from_codes(self.station[rows], categories=self.stations),
+            'platform': self.platform[rows],
+            'value': self.value[rows]
+        }, copy=False)
+        frame.index = pd.RangeIndex(rows.start, rows.stop)
+        return frame
\ No newline at end of file
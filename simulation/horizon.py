@@ -0,0 +1,90 @@
+"""
+Long-horizon runs: weeks of a recurring daily timetable with memory that stays flat.
+
+Instead of keeping the whole event log, the run stops every `fold_every` simulated minutes
+to fold the new rows into per-window KPIs (simulation.metrics.RollingKPIs), optionally spill them
+to disk, and clear the log. Finished trains are then forgotten and their log indices and
+train table rows reused.
+"""
+import importlib.util
+import json
+import os
+import time
+from simulation.env import DAY, setup_simulation_environment
+from simulation.topology import stop_platforms
+from simulation.progress import NullProgress
+from simulation.ai_controller import AIController
+from simulation.metrics import RollingKPIs
+
+ALERTS_KEPT = 15 # The dashboard shows the latest 15 alerts
+
+class EventSpill:
+    """
+    Writes raw event rows and AI decisions to a directory as they are folded away: events as
+    one Parquet file per fold (when pyarrow or fastparquet is installed) or appended to one
+    CSV, and decisions appended to decisions.jsonl.
+    """
+
+    def __init__(self, directory, fmt=None):
+        if fmt is None:
+            fmt = 'parquet' if importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet') else 'csv'
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.format = fmt
+        self.parts = 0
+
+    def write(self, log_df, decision_logs=()):
+        if len(log_df):
+            if self.format == 'parquet':
+                log_df.to_parquet(os.path.join(self.directory, f"events-{self.parts:05d}.parquet"), index=False)
+            else:
+                log_df.to_csv(os.path.join(self.directory, 'events.csv'), mode='a', header=self.parts == 0, index=False)
+            self.parts += 1
+        if decision_logs:
+            with open(os.path.join(self.directory, 'decisions.jsonl'), 'a') as f:
+                for decision in decision_logs:
+                    f.write(json.dumps(decision, default=str) + '\n')
+
+def run_long_simulation(config, window=DAY, fold_every=360, spill_dir=None, progress_bar=None, progress_interval=0.1):
+    """
+    Runs config['days'] days of the recurring timetable (or up to config['stop_time']).
+
+    Returns (windows_df, alerts, controller): the KPIs of each `window` minutes of the run,
+    the latest alerts, and the controller. With `spill_dir` set, every event row and AI
+    decision is written there before it is dropped; otherwise they are only aggregated.
+    """
+    stop_time = config.get('stop_time') or config.get('days', 1) * DAY
+    env, controller = setup_simulation_environment(config, None)
+    env.trains.recycle = True # Finished trains' rows are reused, like their log indices
+    rolling = RollingKPIs(window, stop_platforms(config))
+    spill = EventSpill(spill_dir) if spill_dir else None
+    if progress_bar is None:
+        progress_bar = NullProgress()
+    is_ai = isinstance(controller, AIController)
+
+    checkpoint = fold_every
+    next_report = time.perf_counter() + progress_interval
+    while True:
+        until = min(checkpoint, stop_time)
+        while not env.fleet.processed and env.peek() < until:
+            env.step()
+        done = env.fleet.processed or env.peek() >= stop_time
+
+        finished = rolling.fold(env.event_log)
+        if spill is not None:
+            spill.write(env.event_log.to_frame(), controller.decision_logs if is_ai else ())
+        env.event_log.clear()
+        env.event_log.release_trains(finished)
+        if is_ai:
+            controller.decision_logs.clear()
+            del controller.alerts[:-ALERTS_KEPT]
+
+        if done:
+            break
+        checkpoint += fold_every
+        if time.perf_counter() >= next_report:
+            progress_bar.progress(min(env.now / stop_time, 1.0))
+            next_report = time.perf_counter() + progress_interval
+
+    progress_bar.progress(1.0)
+    return rolling.to_frame(), controller.alerts if is_ai else [], controller
\ No newline at end of file
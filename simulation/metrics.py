@@ -0,0 +1,254 @@
+"""
+KPIs of a run: from a finished log (calculate_kpis), folded in as a log grows (KPIAccumulator)
+or per time window of a long run (RollingKPIs).
+"""
+import pandas as pd
+import numpy as np
+from simulation.events import EVENT_CODES
+
+# Per-train events the KPIs are built from
+KPI_EVENTS = ['depart', 'arrive_final', 'at_platform', 'depart_station']
+
+BASE_TRAVEL_TIME = 110 # A->B (60) + B->C (50), for logs whose depart rows carry no scheduled run time
+STOP_ALLOWANCE = 10 # Scheduled minutes for each stop a train makes
+PUNCTUALITY_THRESHOLD = 10 # Minutes of delay a train may have and still count as punctual
+
+EMPTY_KPIS = {"Punctuality": 0, "Average Delay": 0, "Throughput": 0, "Platform B Utilization": 0, "Total Energy": 0, "Max Delay": 0}
+
+def calculate_kpis(log_df, num_trains, simulation_duration_hours, num_platforms_b):
+    """
+    KPIs of a finished or partial run. Platform utilization is measured against
+    num_platforms_b, the platforms at the stops between origin and destination (Station B
+    on the default line; see simulation.topology.stop_platforms).
+    """
+    if log_df.empty:
+        return dict(EMPTY_KPIS)
+
+    # Energy KPI
+    energy_logs = log_df[log_df['event'] == 'final_energy']
+    total_energy = energy_logs['value'].round().sum() if not energy_logs.empty else 0 # Whole units, as logged
+
+    # Throughput
+    num_arrivals = int((log_df['event'] == 'arrive_final').sum())
+    actual_simulation_end_time = log_df['time'].max()
+
+    # Delay, Punctuality, Max Delay and platform time: one groupby gives every train's event times
+    unique_train_ids = log_df['train_id'].unique()
+    key_events = log_df[log_df['event'].isin(KPI_EVENTS)]
+    times = key_events.groupby(['train_id', 'event'], observed=True)['time'].agg(['min', 'max', 'sum', 'count']).unstack()
+    times = times.reindex(index=unique_train_ids, columns=pd.MultiIndex.from_product([['min', 'max', 'sum', 'count'], KPI_EVENTS]))
+    column = lambda stat, event: times[(stat, event)].to_numpy(dtype=float)
+
+    departures = key_events[key_events['event'] == 'depart']
+    scheduled = np.full(len(unique_train_ids), np.nan)
+    if 'value' in departures:
+        scheduled = departures.groupby('train_id', observed=True)['value'].first().reindex(unique_train_ids).to_numpy(dtype=float)
+    # Completed platform stays: departures minus dockings, less the stay still in progress
+    docked_now = np.nan_to_num(column('count', 'at_platform')) > np.nan_to_num(column('count', 'depart_station'))
+    platform_time = (np.nan_to_num(column('sum', 'depart_station')) - np.nan_to_num(column('sum', 'at_platform'))
+                     + np.where(docked_now, column('max', 'at_platform'), 0))
+
+    return _kpis_from_train_times(
+        column('min', 'depart'), column('max', 'arrive_final'), scheduled,
+        np.nan_to_num(column('count', 'at_platform')), platform_time,
+        num_arrivals, actual_simulation_end_time, total_energy,
+        num_trains, simulation_duration_hours, num_platforms_b)
+
+def _train_delays(depart_time, arrive_time, scheduled_run_time, stops):
+    scheduled_journey_time = np.where(np.isnan(scheduled_run_time), BASE_TRAVEL_TIME, scheduled_run_time) + STOP_ALLOWANCE * stops
+    return np.maximum(0, (arrive_time - depart_time) - scheduled_journey_time)
+
+def _kpis_from_train_times(depart_time, arrive_time, scheduled_run_time, stops, platform_time,
+                           num_arrivals, actual_simulation_end_time, total_energy,
+                           num_trains, simulation_duration_hours, num_platforms_b):
+    """
+    The KPI dict from per-train arrays, one entry per train that has logged anything, in
+    order of its first log entry: departure and final arrival times (NaN until they happen),
+    scheduled run time (NaN if not logged), stops made and completed platform time.
+    """
+    actual_duration_hours = actual_simulation_end_time / 60 if pd.notna(actual_simulation_end_time) and actual_simulation_end_time > 0 else simulation_duration_hours
+    throughput = round(num_arrivals / actual_duration_hours, 2) if actual_duration_hours > 0 else 0
+
+    finished = ~np.isnan(depart_time) & ~np.isnan(arrive_time)
+    all_train_delays = _train_delays(depart_time, arrive_time, scheduled_run_time, stops)[finished]
+    # Sums run train by train (cumsum), in the same order as a plain loop over the trains
+    total_delay = np.cumsum(all_train_delays)[-1] if len(all_train_delays) else 0
+    punctual_trains = int(np.count_nonzero(all_train_delays <= PUNCTUALITY_THRESHOLD))
+    platform_b_occupied_time = np.cumsum(platform_time)[-1] if len(platform_time) else 0
+
+    avg_delay = round(total_delay / len(depart_time), 1) if len(depart_time) else 0
+    punctuality = round((punctual_trains / num_trains) * 100, 1) if num_trains > 0 else 0
+    max_delay = round(all_train_delays.max(), 1) if len(all_train_delays) else 0
+
+    total_available_platform_time = actual_duration_hours * 60 * num_platforms_b
+    platform_b_utilization = round((platform_b_occupied_time / total_available_platform_time) * 100, 1) if total_available_platform_time > 0 else 0
+
+    return {
+        "Punctuality": punctuality, 
+        "Average Delay": avg_delay,
+        "Throughput": throughput, 
+        "Platform B Utilization": platform_b_utilization, 
+        "Total Energy": total_energy,
+        "Max Delay": max_delay
+    }
+
+class _TrainStats:
+    """
+    Per-train KPI inputs folded in from EventLog rows, indexed like the log's trains:
+    departure (first) and final arrival (last) times, scheduled run time, stops made,
+    platform time (departures minus dockings) and when the train docked if it is docked now.
+    """
+    INITIAL = np.array([[np.nan], [np.nan], [np.nan], [0.0], [0.0], [np.nan]])
+
+    def __init__(self):
+        self.data = np.empty((6, 0))
+
+    def fold(self, time, train, event, value, num_trains):
+        if num_trains > self.data.shape[1]:
+            grown = np.repeat(self.INITIAL, num_trains, axis=1)
+            grown[:, :self.data.shape[1]] = self.data
+            self.data = grown
+        depart_time, arrive_time, scheduled, stops, platform_time, docked_at = self.data
+
+        depart = event == EVENT_CODES['depart']
+        if depart.any():
+            np.fmin.at(depart_time, train[depart], time[depart])
+            scheduled[train[depart]] = value[depart]
+        arrive = event == EVENT_CODES['arrive_final']
+        if arrive.any():
+            np.fmax.at(arrive_time, train[arrive], time[arrive])
+
+        dock = event == EVENT_CODES['at_platform']
+        leave = event == EVENT_CODES['depart_station']
+        if dock.any() or leave.any():
+            np.add.at(platform_time, train[leave], time[leave])
+            np.subtract.at(platform_time, train[dock], time[dock])
+            np.add.at(stops, train[dock], 1)
+            # Whether each train is docked now depends on its last docking or departure
+            rows = np.flatnonzero(dock | leave)[::-1]
+            trains, last = np.unique(train[rows], return_index=True)
+            last = rows[last]
+            docked_at[trains] = np.where(dock[last], time[last], np.nan)
+
+    def columns(self, trains):
+        """(depart, arrive, scheduled run time, stops, completed platform time) of the given trains."""
+        depart_time, arrive_time, scheduled, stops, platform_time, docked_at = self.data[:, trains]
+        return depart_time, arrive_time, scheduled, stops, platform_time + np.nan_to_num(docked_at)
+
+    def reset(self, trains):
+        self.data[:, trains] = self.INITIAL
+
+class KPIAccumulator:
+    """
+    Running KPIs over an EventLog that is still being written.
+
+    update() folds in only the rows recorded since the previous call, keeping per-train
+    event times; kpis() then costs O(trains) and equals calculate_kpis on the log so far.
+    """
+
+    def __init__(self, num_trains, simulation_duration_hours, num_platforms_b):
+        self.num_trains = num_trains
+        self.simulation_duration_hours = simulation_duration_hours
+        self.num_platforms_b = num_platforms_b
+        self.rows = 0 # Rows of the log folded in so far
+        self.order = np.empty(0, dtype=np.int64) # Train indices in order of their first log entry
+        self.stats = _TrainStats()
+        self.num_arrivals = 0
+        self.end_time = np.nan
+        self.total_energy = 0
+
+    def update(self, event_log):
+        """Folds in the event log's new rows and returns them as a DataFrame batch."""
+        start, end = self.rows, event_log.size
+        self.rows = end
+        if start == end:
+            return event_log.to_frame(start, end)
+        time, train, event = event_log.time[start:end], event_log.train[start:end], event_log.event[start:end]
+        value = event_log.value[start:end]
+
+        self.stats.fold(time, train, event, value, len(event_log.train_ids))
+        seen = np.zeros(len(event_log.train_ids), dtype=bool)
+        seen[self.order] = True
+        trains, first = np.unique(train, return_index=True)
+        new = ~seen[trains]
+        self.order = np.concatenate([self.order, trains[new][np.argsort(first[new], kind='stable')]])
+
+        self.num_arrivals += int(np.count_nonzero(event == EVENT_CODES['arrive_final']))
+        energy = event == EVENT_CODES['final_energy']
+        if energy.any():
+            self.total_energy += np.round(value[energy]).sum()
+        self.end_time = np.fmax(self.end_time, time.max())
+        return event_log.to_frame(start, end)
+
+    def kpis(self):
+        if self.rows == 0:
+            return dict(EMPTY_KPIS)
+        return _kpis_from_train_times(*self.stats.columns(self.order), self.num_arrivals, self.end_time, self.total_energy,
+                                      self.num_trains, self.simulation_duration_hours, self.num_platforms_b)
+
+class RollingKPIs:
+    """
+    KPIs per time window (a day by default) for runs too long to keep their whole log.
+
+    fold() takes in every row of an EventLog, which the caller then clears. A train's journey
+    is complete once it logs final_energy: its delay, energy and platform time are added to
+    the window it arrived in, its per-train state is dropped and its index is returned so the
+    log can reuse it. Memory is O(running trains + windows), however long the run.
+    Punctuality, Average Delay and Max Delay of a window are over the trains that arrived in it.
+    """
+
+    def __init__(self, window, num_platforms_b):
+        self.window = window
+        self.num_platforms_b = num_platforms_b
+        self.stats = _TrainStats()
+        self.totals = np.zeros((5, 0)) # Per window: arrivals, total delay, punctual trains, energy, platform time
+        self.max_delay = np.zeros(0)
+        self.end_time = 0.0
+
+    @property
+    def running(self):
+        """Trains that departed and have not finished yet."""
+        return int(np.count_nonzero(~np.isnan(self.stats.data[0])))
+
+    def fold(self, event_log):
+        """Folds in all rows of the log and returns the indices of the trains that finished."""
+        n = event_log.size
+        if n == 0:
+            return np.empty(0, dtype=np.int32)
+        time, train, event, value = event_log.time[:n], event_log.train[:n], event_log.event[:n], event_log.value[:n]
+        self.stats.fold(time, train, event, value, len(event_log.train_ids))
+        self.end_time = max(self.end_time, float(time.max()))
+
+        done = event == EVENT_CODES['final_energy']
+        finished = train[done]
+        if not len(finished):
+            return finished
+        depart, arrive, scheduled, stops, platform_time = self.stats.columns(finished)
+        delay = _train_delays(depart, arrive, scheduled, stops)
+        windows = (arrive // self.window).astype(np.int64)
+        if windows.max() >= self.totals.shape[1]:
+            self.totals = np.pad(self.totals, ((0, 0), (0, windows.max() + 1 - self.totals.shape[1])))
+            self.max_delay = np.pad(self.max_delay, (0, windows.max() + 1 - len(self.max_delay)))
+        for row, values in enumerate([1, delay, delay <= PUNCTUALITY_THRESHOLD, np.round(value[done]), platform_time]):
+            np.add.at(self.totals[row], windows, values)
+        np.maximum.at(self.max_delay, windows, delay)
+        self.stats.reset(finished)
+        return finished
+
+    def to_frame(self):
+        """One row per window with its arrivals and KPIs."""
+        arrivals, total_delay, punctual, energy, platform_time = self.totals
+        start = np.arange(len(arrivals)) * self.window
+        per_arrival = np.maximum(arrivals, 1)
+        return pd.DataFrame({
+            'Window': np.arange(len(arrivals)),
+            'Start': start,
+            'End': start + self.window,
+            'Arrivals': arrivals.astype(int),
+            'Punctuality': np.round(punctual / per_arrival * 100, 1),
+            'Average Delay': np.round(total_delay / per_arrival, 1),
+            'Throughput': np.round(arrivals / (self.window / 60), 2),
+            'Platform B Utilization': np.round(platform_time / (self.window * self.num_platforms_b) * 100, 1),
+            'Total Energy': energy,
+            'Max Delay': np.round(self.max_delay, 1)
+        })
\ No newline at end of file
@@ -0,0 +1,114 @@
+import multiprocessing
+import queue
+import random
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ai.model import AIManager
+from simulation.env import run_simulation
+from simulation.horizon import run_long_simulation
+from simulation.branching import run_branches
+from simulation.progress import NullProgress
+from simulation.topology import stop_platforms
+from simulation.metrics import calculate_kpis
+
+# Per-worker state, set once by _init_worker
+_worker_ai_manager = None
+_worker_progress = None
+
+class QueueProgress:
+    """Progress sink with the progress_bar interface that forwards updates to the parent process."""
+    def __init__(self, progress_queue, name):
+        self.queue = progress_queue
+        self.name = name
+
+    def progress(self, value):
+        self.queue.put((self.name, value))
+
+def _init_worker(manager_args, progress_queue):
+    """Loads the models once per worker from the artifact cache instead of pickling them per task."""
+    global _worker_ai_manager, _worker_progress
+    random.seed() # Forked workers would otherwise share the parent's random state (runs without a seed use it)
+    if manager_args is not None:
+        _worker_ai_manager = AIManager(**manager_args)
+        _worker_ai_manager.load_or_train()
+    _worker_progress = progress_queue
+
+def _run_task(name, config):
+    if config.get('is_ai_controlled'):
+        config = {**config, 'ai_manager': _worker_ai_manager}
+    log_df, alerts, controller = run_simulation(config, QueueProgress(_worker_progress, name))
+    # The controller holds the environment and its generators, so only its logs travel back
+    return name, log_df, alerts, getattr(controller, 'decision_logs', [])
+
+def simulate(key, config):
+    """Runs a config with no progress reporting and returns its logs, decisions and KPIs."""
+    if config.get('is_ai_controlled'):
+        config = {**config, 'ai_manager': _worker_ai_manager}
+    log_df, alerts, controller = run_simulation(config, NullProgress(), config.get('stop_time'))
+    days = config.get('days', 1)
+    kpis = calculate_kpis(log_df, config['num_trains'] * days, 24 * days, stop_platforms(config))
+    return key, log_df, alerts, getattr(controller, 'decision_logs', []), kpis
+
+def simulate_kpis(key, config):
+    """Runs a config and returns only its KPIs, which is all a replication needs to send back."""
+    if config.get('is_ai_controlled'):
+        config = {**config, 'ai_manager': _worker_ai_manager}
+    log_df, _, _ = run_simulation(config, NullProgress())
+    days = config.get('days', 1)
+    return key, calculate_kpis(log_df, config['num_trains'] * days, 24 * days, stop_platforms(config))
+
+def simulate_horizon(key, config, window=1440, spill_dir=None):
+    """Runs a long-horizon config and returns its per-window KPIs and latest alerts."""
+    if config.get('is_ai_controlled'):
+        config = {**config, 'ai_manager': _worker_ai_manager}
+    windows_df, alerts, _ = run_long_simulation(config, window, spill_dir=spill_dir)
+    return key, windows_df, alerts
+
+def simulate_branches(key, config, at, branches):
+    """Runs a config to minute `at` once, then forks it into `branches` (see simulation.branching)."""
+    if config.get('is_ai_controlled'):
+        config = {**config, 'ai_manager': _worker_ai_manager}
+    return key, run_branches(config, at, branches)
+
+def make_pool(ai_manager=None, max_workers=None, progress_queue=None):
+    """A process pool whose workers each load `ai_manager`'s models once, from its artifact cache."""
+    manager_args = None
+    if ai_manager is not None:
+        ai_manager.load_or_train() # Makes sure the artifact exists before the workers look for it
+        manager_args = {'historical_data_path': ai_manager.data_path, 'n_platforms_b': ai_manager.n_platforms_b,
+                        'backend': ai_manager.backend, 'cache_dir': ai_manager.cache_dir}
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(),
+                               initializer=_init_worker, initargs=(manager_args, progress_queue))
+
+def run_simulations_parallel(configs, progress_bars=None, ai_manager=None, max_workers=None):
+    """
+    Runs several simulation configs at once in a process pool.
+
+    `configs` maps a run name to its config; AI runs use a manager rebuilt in each worker
+    from `ai_manager`'s artifact cache. Progress updates are forwarded to the matching
+    entry of `progress_bars` while the runs are going. Returns a dict mapping each name to
+    (log_df, alerts, decision_logs).
+    """
+    progress_bars = progress_bars or {}
+    progress_queue = multiprocessing.get_context().Queue()
+    tasks = {name: {**config, 'ai_manager': None} for name, config in configs.items()}
+    results = {}
+
+    with make_pool(ai_manager, max_workers or len(tasks), progress_queue) as pool:
+        pending = {pool.submit(_run_task, name, config) for name, config in tasks.items()}
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, log_df, alerts, decision_logs = future.result()
+                results[name] = (log_df, alerts, decision_logs)
+            _drain(progress_queue, progress_bars)
+    _drain(progress_queue, progress_bars)
+    return results
+
+def _drain(progress_queue, progress_bars):
+    while True:
+        try:
+            name, value = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if name in progress_bars:
+            progress_bars[name].progress(value)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import logging
+
+class NullProgress:
+    """Progress sink that ignores updates."""
+    def progress(self, value):
+        pass
+
+class LoggingProgress:
+    """Progress sink that logs every `step` of progress (as a fraction) for a named run."""
+    def __init__(self, name, step=0.25, logger=None):
+        self.name = name
+        self.step = step
+        self.logger = logger or logging.getLogger('simulation')
+        self._next = step
+
+    def progress(self, value):
+        if value >= self._next or value >= 1.0:
+            self.logger.info("%s: %.0f%%", self.name, value * 100)
+            while self._next <= value:
+                self._next += self.step
\ No newline at end of file
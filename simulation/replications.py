@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import as_completed
+from simulation.parallel import make_pool, simulate_kpis
+
+CONTROLLERS = {'Baseline (Non-AI)': False, 'Optimized (AI)': True}
+
+def replication_seeds(base_seed, n):
+    """Independent, reproducible seeds for n replications, spawned from one base seed."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(base_seed).spawn(n)]
+
+def run_replications(config, n, base_seed=0, ai_manager=None, max_workers=None, on_result=None):
+    """
+    Runs n seeded replications of `config` for each controller across a process pool.
+
+    Replication i uses the same seed for both controllers, so each pair sees the same trains.
+    `on_result(row)` is called with each replication's KPI row as soon as it finishes.
+    Returns every row as a DataFrame (replication, seed, controller and one column per KPI).
+    """
+    seeds = replication_seeds(base_seed, n)
+    rows = []
+    with make_pool(ai_manager, max_workers) as pool:
+        futures = [
+            pool.submit(simulate_kpis, (i, seed, controller), {**config, 'is_ai_controlled': is_ai, 'ai_manager': None, 'seed': seed})
+            for i, seed in enumerate(seeds) for controller, is_ai in CONTROLLERS.items()
+        ]
+        for future in as_completed(futures):
+            (i, seed, controller), kpis = future.result()
+            row = {'replication': i, 'seed': seed, 'controller': controller, **{k: float(v) for k, v in kpis.items()}}
+            rows.append(row)
+            if on_result is not None:
+                on_result(row)
+    return pd.DataFrame(rows).sort_values(['replication', 'controller'], ignore_index=True)
+
+def summarize_replications(results, confidence=0.95):
+    """Mean, standard deviation and Student-t confidence interval of each KPI per controller."""
+    if results.empty:
+        return pd.DataFrame()
+    from scipy import stats # Deferred: scipy.stats is slow to import and only needed here
+    kpi_names = [c for c in results.columns if c not in ('replication', 'seed', 'controller')]
+    long = results.melt(id_vars='controller', value_vars=kpi_names, var_name='KPI')
+    summary = long.groupby(['KPI', 'controller'], sort=False)['value'].agg(['count', 'mean', 'std']).reset_index()
+    summary['std'] = summary['std'].fillna(0)
+    t = stats.t.ppf(0.5 + confidence / 2, np.maximum(summary['count'] - 1, 1))
+    half_width = t * summary['std'] / np.sqrt(summary['count'])
+    summary['ci_low'] = summary['mean'] - half_width
+    summary['ci_high'] = summary['mean'] + half_width
+    return summary.rename(columns={'controller': 'Controller', 'count': 'n', 'mean': 'Mean', 'std': 'Std',
+                                   'ci_low': f'CI {confidence:.0%} low', 'ci_high': f'CI {confidence:.0%} high'})
\ No newline at end of file
@@ -1,4 +1,4 @@
-import simpy
+from simulation.engine import ObservableResource
 
 class Station:
     """Represents a train station with a number of platforms."""
@@ -7,4 +7,4 @@ class Station:
         self.env = env
         self.name = name
         # Platforms are a shared resource for trains
-        self.platforms = simpy.Resource(env, capacity=num_platforms)
\ No newline at end of file
+        self.platforms = ObservableResource(env, capacity=num_platforms)
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Parameter sweeps: a grid or Latin-hypercube sample of scenario settings, each point run for
+both controllers across a process pool, with KPIs collected in one table.
+
+A sweep space maps parameters (those in SWEEP_PARAMETERS) to the values to try:
+
+    {'num_trains': [20, 40, 60], 'platforms_b': [1, 2, 3], 'disaster_mode': [False, True]}
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import as_completed
+from simulation.env import make_timetable
+from simulation.parallel import make_pool, simulate_kpis
+from simulation.replications import CONTROLLERS
+from simulation.metrics import EMPTY_KPIS
+
+SWEEP_PARAMETERS = ('num_trains', 'platforms_a', 'platforms_b', 'platforms_c', 'what_if_train', 'what_if_delay', 'disaster_mode')
+KPI_NAMES = list(EMPTY_KPIS)
+
+def check_space(space):
+    """Raises ValueError if `space` sweeps a parameter outside SWEEP_PARAMETERS or gives one no values."""
+    unknown = [name for name in space if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Cannot sweep {', '.join(map(repr, unknown))}; sweepable parameters are {', '.join(SWEEP_PARAMETERS)}")
+    empty = [name for name, values in space.items() if not len(values)]
+    if empty:
+        raise ValueError(f"No values to sweep for {', '.join(map(repr, empty))}")
+
+def grid_points(space):
+    """Every combination of the values in `space`."""
+    check_space(space)
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def latin_hypercube_points(space, n, seed=0):
+    """
+    n points in which each parameter's values are used equally often (as far as n allows)
+    and independently of the others: a Latin hypercube over the value lists.
+    """
+    check_space(space)
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(n)]
+    for name, values in space.items():
+        strata = (rng.permutation(n) + rng.random(n)) / n
+        for point, u in zip(points, strata):
+            point[name] = values[int(u * len(values))]
+    return points
+
+def run_sweep(base_config, points, seed=0, ai_manager=None, max_workers=None, on_result=None):
+    """
+    Runs each point (settings applied over base_config) for both controllers across a process
+    pool whose workers load the models once. Every run uses `seed`, and both controllers of
+    a point share one precomputed timetable, as do all points with the same number of
+    trains and disaster mode. `on_result(row)` sees each run's row as it finishes.
+
+    Returns one row per run: the point's index and settings, the controller and its KPIs.
+    """
+    timetables = {}
+    rows = []
+    with make_pool(ai_manager, max_workers) as pool:
+        futures = []
+        for i, point in enumerate(points):
+            config = {**base_config, **point, 'seed': seed, 'ai_manager': None}
+            shape = (config['num_trains'], config['disaster_mode'])
+            if shape not in timetables:
+                timetables[shape] = make_timetable(config['num_trains'], seed, config['disaster_mode'])
+            config['timetable'] = timetables[shape]
+            for controller, is_ai in CONTROLLERS.items():
+                futures.append(pool.submit(simulate_kpis, (i, controller), {**config, 'is_ai_controlled': is_ai}))
+        for future in as_completed(futures):
+            (i, controller), kpis = future.result()
+            row = {'point': i, **points[i], 'controller': controller, **{k: float(v) for k, v in kpis.items()}}
+            rows.append(row)
+            if on_result is not None:
+                on_result(row)
+    return pd.DataFrame(rows).sort_values(['point', 'controller'], ignore_index=True)
+
+def kpi_deltas(results):
+    """One row per point: its settings and each KPI of the AI run minus the baseline's."""
+    if results.empty:
+        return pd.DataFrame()
+    ai = next(controller for controller, is_ai in CONTROLLERS.items() if is_ai)
+    baseline = next(controller for controller, is_ai in CONTROLLERS.items() if not is_ai)
+    by_controller = results.set_index(['point', 'controller'])[KPI_NAMES].unstack('controller')
+    deltas = by_controller.xs(ai, axis=1, level='controller') - by_controller.xs(baseline, axis=1, level='controller')
+    settings = results.drop_duplicates('point').set_index('point').drop(columns=['controller', *KPI_NAMES])
+    return settings.join(deltas).reset_index()
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Line and network topologies: stations with platform counts joined by blocks of track.
+
+Everything the simulation touches on its hot path is referenced by integer index: stations
+and blocks are lists, and each train follows a Route precomputed once per origin and
+destination. A topology comes from config['topology'] (a Topology, a dict or the path of a
+JSON/YAML file); without one, the default A-B-C line is built from the sidebar settings.
+
+A topology file lists the stations and either the blocks between them or, for a corridor,
+each station's travel time from the previous one:
+
+    stations:
+      - {name: A, platforms: 2}
+      - {name: B, platforms: 1, travel_time: 60}
+      - {name: C, platforms: 2, travel_time: 50, block_capacity: 2}
+
+    # or, for a network:
+    blocks:
+      - {from: A, to: B, travel_time: 60}
+      - {from: B, to: C, travel_time: 50, capacity: 2, name: Loop_B_C}
+
+Trains run from `origin` to `destination` (the first and last station unless set), along
+the fastest path. Stations between the two are the stops where a train docks or passes.
+"""
+import functools
+import heapq
+import json
+from simulation.events import NO_BLOCK
+
+class Route:
+    """
+    A precomputed itinerary: the station indices visited, the block index and travel time
+    of each leg, and for each leg the (previous, focus, downstream block) indices the AI
+    features look at. The focus is the next station the train stops at or passes, or the
+    last one once only the destination is left; on the default line it is always B.
+    """
+    __slots__ = ('stations', 'blocks', 'travel_times', 'scheduled_time', 'anchors')
+
+    def __init__(self, stations, blocks, travel_times):
+        self.stations = tuple(stations)
+        self.blocks = tuple(blocks)
+        self.travel_times = tuple(travel_times)
+        self.scheduled_time = sum(self.travel_times)
+        last_stop = max(len(self.stations) - 2, 1)
+        self.anchors = []
+        for leg in range(len(self.blocks)):
+            focus = min(leg + 1, last_stop)
+            downstream = self.blocks[focus] if focus < len(self.blocks) else NO_BLOCK
+            self.anchors.append((self.stations[focus - 1], self.stations[focus], downstream))
+        self.anchors = tuple(self.anchors)
+
+    @property
+    def stops(self):
+        """Stations between origin and destination."""
+        return self.stations[1:-1]
+
+class Topology:
+    def __init__(self, stations, blocks, origin=None, destination=None):
+        """
+        `stations` is a list of (name, platforms); `blocks` a list of dicts with `from` and
+        `to` station names, `travel_time` and optionally `capacity` (default 1) and `name`.
+        """
+        self.station_names = [name for name, _ in stations]
+        self.platforms = [int(platforms) for _, platforms in stations]
+        self.station_index = {name: i for i, name in enumerate(self.station_names)}
+        if len(self.station_index) != len(self.station_names):
+            raise ValueError("Station names must be unique")
+
+        self.block_names, self.block_ends, self.travel_times, self.block_capacities = [], [], [], []
+        self._adjacency = [[] for _ in self.station_names]
+        for block in blocks:
+            start, end = self._station(block['from']), self._station(block['to'])
+            self.block_names.append(block.get('name', f"Block_{block['from']}_{block['to']}"))
+            self.block_ends.append((start, end))
+            self.travel_times.append(block['travel_time'])
+            self.block_capacities.append(int(block.get('capacity', 1)))
+            self._adjacency[start].append((end, len(self.block_names) - 1))
+        self.block_index = {name: i for i, name in enumerate(self.block_names)}
+
+        self.origin = self._station(origin if origin is not None else 0)
+        self.destination = self._station(destination if destination is not None else len(self.station_names) - 1)
+        self._routes = {}
+
+    def _station(self, station):
+        """A station index from its name or index."""
+        if isinstance(station, str):
+            if station not in self.station_index:
+                raise ValueError(f"Unknown station {station!r}")
+            return self.station_index[station]
+        return int(station)
+
+    @classmethod
+    def from_dict(cls, data):
+        stations = [(s['name'], s.get('platforms', 1)) for s in data['stations']]
+        blocks = data.get('blocks')
+        if blocks is None:
+            # A corridor: each station after the first is reached from the previous one
+            blocks = [{'from': prev['name'], 'to': s['name'], 'travel_time': s['travel_time'], 'capacity': s.get('block_capacity', 1)}
+                      for prev, s in zip(data['stations'], data['stations'][1:])]
+        return cls(stations, blocks, data.get('origin'), data.get('destination'))
+
+    def route(self, origin=None, destination=None):
+        """The fastest route between two stations (default: the topology's), computed once."""
+        origin = self.origin if origin is None else self._station(origin)
+        destination = self.destination if destination is None else self._station(destination)
+        key = (origin, destination)
+        if key not in self._routes:
+            self._routes[key] = self._shortest_route(origin, destination)
+        return self._routes[key]
+
+    def _shortest_route(self, origin, destination):
+        best = {origin: 0}
+        previous = {}
+        heap = [(0, origin)]
+        while heap:
+            time, station = heapq.heappop(heap)
+            if station == destination:
+                break
+            if time > best[station]:
+                continue
+            for neighbour, block in self._adjacency[station]:
+                arrival = time + self.travel_times[block]
+                if arrival < best.get(neighbour, float('inf')):
+                    best[neighbour] = arrival
+                    previous[neighbour] = (station, block)
+                    heapq.heappush(heap, (arrival, neighbour))
+        if destination not in best or origin == destination:
+            raise ValueError(f"No route from {self.station_names[origin]} to {self.station_names[destination]}")
+
+        stations, blocks = [destination], []
+        while stations[-1] != origin:
+            station, block = previous[stations[-1]]
+            stations.append(station)
+            blocks.append(block)
+        stations.reverse()
+        blocks.reverse()
+        return Route(stations, blocks, [self.travel_times[block] for block in blocks])
+
+    @property
+    def stop_platforms(self):
+        """Platforms at the stops of the default route, the denominator of platform utilization."""
+        return sum(self.platforms[station] for station in self.route().stops)
+
+def default_topology(config):
+    """The A-B-C line with the platform counts and travel times of a sidebar config."""
+    return Topology(
+        [('A', config['platforms_a']), ('B', config['platforms_b']), ('C', config['platforms_c'])],
+        [{'from': 'A', 'to': 'B', 'travel_time': config.get('travel_time_ab', 60)},
+         {'from': 'B', 'to': 'C', 'travel_time': config.get('travel_time_bc', 50)}])
+
+@functools.lru_cache(maxsize=16)
+def load_topology(path):
+    """Reads a topology from a .json, .yaml or .yml file."""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml # Only needed for YAML topology files
+            return Topology.from_dict(yaml.safe_load(f))
+        return Topology.from_dict(json.load(f))
+
+def topology_from_config(config):
+    topology = config.get('topology')
+    if topology is None:
+        return default_topology(config)
+    if isinstance(topology, Topology):
+        return topology
+    if isinstance(topology, dict):
+        return Topology.from_dict(topology)
+    return load_topology(topology)
+
+def stop_platforms(config):
+    """Platform count the utilization KPI of a config's runs is measured against."""
+    if config.get('topology') is None:
+        return config['platforms_b']
+    return topology_from_config(config).stop_platforms
\ No newline at end of file
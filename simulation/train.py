@@ -1,82 +1,229 @@
-import simpy
+import numpy as np
+import pandas as pd
+from simulation.events import EVENT_CODES
+
+ENERGY_RATES = {"Full Speed": 5, "Eco-Coast": 1.5} # High consumption vs. low consumption while coasting
+
+class TrainTable:
+    """
+    Static attributes of a run's trains in preallocated columns, one row per train: id,
+    route (an index into `routes`), priority, dwell at each stop and initial delay. Trains
+    refer to their row by index. Columns double in size when full.
+
+    With `recycle` set, a finished train's row is freed and handed to a later train, so
+    long-horizon runs keep only the rows of trains still running.
+    """
+
+    def __init__(self, routes=(), capacity=1024, recycle=False):
+        self.routes = list(routes)
+        self.recycle = recycle
+        self.train_ids = []
+        self._free = []
+        self.route = np.empty(capacity, dtype=np.int16)
+        self.priority = np.empty(capacity, dtype=np.int8)
+        self.stop_duration = np.empty(capacity, dtype=np.int16)
+        self.initial_delay = np.empty(capacity)
+
+    def __len__(self):
+        return len(self.train_ids)
+
+    def add(self, train_id, route, stop_duration, initial_delay=0):
+        """Adds a train on routes[route] and returns its row."""
+        if self._free:
+            index = self._free.pop()
+            self.train_ids[index] = train_id
+        else:
+            index = len(self.train_ids)
+            if index == len(self.route):
+                self._grow()
+            self.train_ids.append(train_id)
+        self.route[index] = route
+        self.priority[index] = 1 if stop_duration == 0 else 2 # Express trains pass through every stop
+        self.stop_duration[index] = stop_duration
+        self.initial_delay[index] = initial_delay
+        return index
+
+    def release(self, index):
+        if self.recycle:
+            self._free.append(index)
+
+    def _grow(self):
+        for column in ('route', 'priority', 'stop_duration', 'initial_delay'):
+            array = getattr(self, column)
+            setattr(self, column, np.concatenate([array, np.empty_like(array)]))
+
+    def to_frame(self):
+        n = len(self.train_ids)
+        return pd.DataFrame({
+            'train_id': self.train_ids,
+            'route': self.route[:n],
+            'priority': self.priority[:n],
+            'stop_duration': self.stop_duration[:n],
+            'initial_delay': self.initial_delay[:n]
+        })
 
 class Train:
-    def __init__(self, env, train_id, controller, stops, initial_delay=0):
+    """
+    A running train: its dynamic state and SimPy process. Static attributes live in the
+    run's TrainTable (env.trains) at row `index`.
+    """
+    __slots__ = ('env', 'controller', 'table', 'index', 'route', 'anchors', 'energy_consumed', 'drive_mode',
+                 '_time_traveled', '_total_travel_time', '_arrival', '_uses_clock', '_decision', '_decided_hour',
+                 '_inputs_changed', '_hold', 'event_log', '_log_index', 'action')
+
+    def __init__(self, env, index, controller):
         self.env = env
-        self.train_id = train_id
         self.controller = controller
+        self.table = env.trains
+        self.index = index
         
-        self.stops = stops
-        self.scheduled_stop_duration_b = stops.get('B', {}).get('stop_duration', 0)
-        self.travel_time_ab = stops.get('B', {}).get('travel_time_from_prev', 60)
-        self.travel_time_bc = stops.get('C', {}).get('travel_time_from_prev', 50)
-        self.priority = 1 if self.scheduled_stop_duration_b == 0 else 2
+        self.route = self.table.routes[self.table.route[index]] # simulation.topology.Route, shared by every train on it
+        self.anchors = self.route.anchors[0] # (previous, focus, downstream block) the features read
         
         # NEW: Energy and Speed state
         self.energy_consumed = 0
         self.drive_mode = "Full Speed" # Can be "Full Speed" or "Eco-Coast"
 
-        self.initial_delay = initial_delay
-        self.log = []
+        # Travel state for the segment in progress (see travel_segment)
+        self._time_traveled = self._total_travel_time = 0
+        self._arrival = None
+        self._uses_clock = False
+        self._decision = None
+        self._decided_hour = None
+        self._inputs_changed = False
+        self._hold = 0 # Breakdown minutes the train still has to stand still for (see hold)
+
+        self.event_log = env.event_log # Shared columnar recorder (simulation.events.EventLog)
+        self._log_index = self.event_log.add_train(self.train_id)
         self.action = env.process(self.run())
 
+    @property
+    def train_id(self):
+        return self.table.train_ids[self.index]
+
+    @property
+    def priority(self):
+        return int(self.table.priority[self.index])
+
+    @property
+    def stop_duration(self):
+        """Dwell at each stop; 0 passes straight through."""
+        return int(self.table.stop_duration[self.index])
+
+    @property
+    def initial_delay(self):
+        delay = self.table.initial_delay[self.index]
+        return int(delay) if delay.is_integer() else float(delay)
+
     def run(self):
-        if self.initial_delay > 0:
-            yield self.env.timeout(self.initial_delay)
-            self._add_log("start_delayed", f"Starts with {self.initial_delay} min delay")
+        route = self.route
+        initial_delay, stop_duration = self.initial_delay, self.stop_duration
+        if initial_delay > 0:
+            yield self.env.timeout(initial_delay)
+            self._add_log("start_delayed", value=initial_delay)
 
-        self._add_log("depart", "Departed from Station A")
+        self._add_log("depart", station=route.stations[0], value=route.scheduled_time)
         
-        yield self.env.process(self.travel_segment("Block_A_B", self.travel_time_ab))
-
-        self._add_log("arrive_station", "Arrived at vicinity of Station B")
-        if self.scheduled_stop_duration_b > 0:
-            platform_request_process = self.controller.request_platform(self, 'B')
-            yield platform_request_process
-            platform_id = platform_request_process.value
-            self._add_log("at_platform", f"Docked at Station B Platform {platform_id}")
-            yield self.env.timeout(self.scheduled_stop_duration_b)
-            self.controller.release_platform(self, 'B', platform_id)
-            self._add_log("depart_station", "Departed from Station B")
-        else:
-            yield self.controller.request_pass_through(self, 'B')
-            self._add_log("pass_through", "Passing through Station B")
+        for leg, block in enumerate(route.blocks):
+            self.anchors = route.anchors[leg]
+            yield self.env.process(self.travel_segment(block, route.travel_times[leg]))
+            station = route.stations[leg + 1]
+            if leg == len(route.blocks) - 1:
+                break
 
-        yield self.env.process(self.travel_segment("Block_B_C", self.travel_time_bc))
+            self._add_log("arrive_station", station=station)
+            if stop_duration > 0:
+                platform_request_process = self.controller.request_platform(self, station)
+                yield platform_request_process
+                platform_id = platform_request_process.value
+                self._add_log("at_platform", station=station, platform=platform_id)
+                yield self.env.timeout(stop_duration)
+                self.controller.release_platform(self, station, platform_id)
+                self._add_log("depart_station", station=station)
+            else:
+                yield self.controller.request_pass_through(self, station)
+                self._add_log("pass_through", station=station)
         
-        self._add_log("arrive_final", "Arrived at final destination Station C")
-        self._add_log("final_energy", f"Total energy consumed: {self.energy_consumed:.0f} units")
+        self._add_log("arrive_final", station=route.stations[-1])
+        self._add_log("final_energy", value=self.energy_consumed)
+        self.table.release(self.index)
 
-    def travel_segment(self, block_name, total_travel_time):
-        """Simulates travel over a block, checking for drive mode and calculating energy."""
-        self._add_log("travel_start", f"Traveling on {block_name}")
-        yield self.controller.request_block(self.train_id, block_name)
-        
-        time_traveled = 0
-        while time_traveled < total_travel_time:
-            # Ask controller for drive mode
-            self.drive_mode = self.controller.get_drive_mode(self)
-            
-            energy_rate = 0
-            time_step = 1 # Simulate 1 minute at a time
-            
-            if self.drive_mode == "Full Speed":
-                energy_rate = 5 # High consumption
-            elif self.drive_mode == "Eco-Coast":
-                energy_rate = 1.5 # Low consumption, travels slower
-                total_travel_time += 0.25 # Coasting adds a 15-second penalty per minute
-            
-            self.energy_consumed += energy_rate * time_step
-            yield self.env.timeout(time_step)
-            time_traveled += time_step
-        
-        self.controller.release_block(block_name)
-        self._add_log("travel_end", f"Finished travel on {block_name}")
-
-    def _add_log(self, event, details):
-        self.log.append({
-            'time': self.env.now,
-            'train_id': self.train_id,
-            'event': event,
-            'details': details
-        })
\ No newline at end of file
+    def travel_segment(self, block, total_travel_time):
+        """
+        Simulates travel over a block, checking for drive mode and calculating energy.
+
+        Each minute of travel is a tick (see TickEnvironment) rather than a Timeout and a
+        process resume, so it runs in exactly the same order as the one-minute timeouts did.
+        The controller is only asked again when a resource its features read has changed or
+        the hour has moved on; otherwise the last decision still holds. Arrival is the only
+        event the process waits for.
+        """
+        self._add_log("travel_start", block=block)
+        block_request = self.controller.request_block(self.train_id, block)
+        yield block_request
+
+        if total_travel_time > 0:
+            resources, self._uses_clock = self.controller.drive_mode_inputs(self)
+            for resource in resources:
+                resource.watchers.append(self._on_input_changed)
+
+            self._time_traveled, self._total_travel_time = 0, total_travel_time
+            self._decision = None
+            self._arrival = self.env.event()
+            self._travel_minute()
+            yield self._arrival
+
+            for resource in resources:
+                resource.watchers.remove(self._on_input_changed)
+
+        self.controller.release_block(block, block_request)
+        self._add_log("travel_end", block=block)
+
+    def _travel_minute(self):
+        """Decides the drive mode for the next minute of travel."""
+        if self._hold:
+            # Broken down: stand still on the block, using no energy, then carry on
+            slot, self._hold = self.env.reserve(self._hold), 0
+            self.env.schedule_tick(slot, self._travel_minute)
+            return
+
+        slot = self.env.reserve(1) # Where the one-minute timeout created now would go
+        hour = self.env.now // 60 if self._uses_clock else None
+        if self._decision is not None and not self._inputs_changed and hour == self._decided_hour:
+            self._drive_minute(slot, new_decision=False)
+            return
+
+        self._decision, self._decided_hour, self._inputs_changed = self.controller.request_drive_mode(self), hour, False
+        if self._decision.value is None:
+            # Batched decision: scored once every train deciding at this instant has queued
+            self._decision.ready.callbacks.append(lambda event: self._drive_minute(slot, new_decision=True))
+        else:
+            self._drive_minute(slot, new_decision=True)
+
+    def _drive_minute(self, slot, new_decision):
+        self.drive_mode = self._decision.value
+        if new_decision:
+            self.controller.record_drive_mode(self, self._decision, self.env.now)
+        self.energy_consumed += ENERGY_RATES.get(self.drive_mode, 0)
+        if self.drive_mode == "Eco-Coast":
+            self._total_travel_time += 0.25 # Coasting adds a 15-second penalty per minute
+
+        self._time_traveled += 1
+        if self._time_traveled < self._total_travel_time:
+            self.env.schedule_tick(slot, self._travel_minute)
+        else:
+            self.env.schedule_at(slot, self._arrival)
+
+    def hold(self, minutes):
+        """
+        Breaks the train down for `minutes`: it stands still on the block it is travelling from
+        the next minute of travel on, or if it is not on one (queuing, docked), on the next block
+        it travels. A stopped train uses no energy and makes no drive-mode decisions.
+        """
+        self._hold += minutes
+
+    def _on_input_changed(self, resource):
+        self._inputs_changed = True
+
+    def _add_log(self, event, **payload):
+        self.event_log.record(self.env.now, self._log_index, EVENT_CODES[event], **payload)
\ No newline at end of file
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai.model import AIManager
+
+@pytest.fixture(scope='session')
+def ai_manager(tmp_path_factory):
+    """Models trained on the bundled CSV, cached outside the repository."""
+    manager = AIManager(os.path.join(ROOT, 'data', 'historical.csv'), cache_dir=str(tmp_path_factory.mktemp('model_cache')))
+    manager.train_models(n_jobs=1)
+    return manager
+
+@pytest.fixture(scope='session')
+def cached_ai_manager(tmp_path_factory):
+    """Models loaded from an on-disk artifact, which process-pool workers can load too."""
+    manager = AIManager(os.path.join(ROOT, 'data', 'historical.csv'), cache_dir=str(tmp_path_factory.mktemp('model_cache')))
+    manager.load_or_train(n_jobs=1)
+    return manager
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""ScenarioCache: stable keys and least-recently-used eviction."""
+import os
+import subprocess
+import sys
+from simulation.cache import ScenarioCache, scenario_key
+
+CONFIG = {'num_trains': 15, 'platforms_a': 2, 'platforms_b': 2, 'platforms_c': 2, 'disaster_mode': False,
+          'what_if_train': 'T05', 'what_if_delay': 25, 'is_ai_controlled': True, 'seed': 7}
+
+def test_key_ignores_order_and_presentation_settings():
+    key = scenario_key(CONFIG, 'model-a')
+    assert scenario_key(dict(reversed(list(CONFIG.items()))), 'model-a') == key
+    assert scenario_key({**CONFIG, 'live_updates': True, 'use_cache': True, 'ai_manager': object()}, 'model-a') == key
+    assert scenario_key({**CONFIG, 'seed': 8}, 'model-a') != key
+    assert scenario_key({**CONFIG, 'what_if_delay': 30}, 'model-a') != key
+    assert scenario_key(CONFIG, 'model-b') != key
+
+def test_key_is_stable_across_processes():
+    code = f"from simulation.cache import scenario_key; print(scenario_key({CONFIG!r}, 'model-a'))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for hash_seed in ('1', '2'):
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONHASHSEED': hash_seed}).stdout
+        assert output.strip() == scenario_key(CONFIG, 'model-a')
+
+def test_round_trip_and_misses(tmp_path):
+    cache = ScenarioCache(str(tmp_path))
+    assert cache.get('missing') is None
+    cache.put('key', {'kpis': {'Total Energy': 3920.0}})
+    assert cache.get('key') == {'kpis': {'Total Energy': 3920.0}}
+    with open(tmp_path / 'broken.pkl.gz', 'wb') as f:
+        f.write(b'not gzip')
+    assert cache.get('broken') is None
+
+def test_evicts_least_recently_used(tmp_path):
+    results = lambda n: {'log': bytes([n]) * 1000}
+    cache = ScenarioCache(str(tmp_path))
+    cache.put('a', results(1))
+    cache.put('b', results(2))
+    cache.max_bytes = 2 * os.path.getsize(tmp_path / 'a.pkl.gz') + 10 # Room for two entries
+    os.utime(tmp_path / 'a.pkl.gz', (1000, 1000))
+    os.utime(tmp_path / 'b.pkl.gz', (2000, 2000))
+
+    assert cache.get('a') == results(1) # 'a' is now the most recently used
+    cache.put('c', results(3))
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl.gz', 'c.pkl.gz']
+    assert cache.get('b') is None
\ No newline at end of file
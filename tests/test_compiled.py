@@ -0,0 +1,32 @@
+"""CompiledForest against the Pipeline.predict it is compiled from."""
+import numpy as np
+import pytest
+from ai.compiled import CompiledForest
+from ai.features import FEATURES
+from ai.lookup import DecisionTable
+
+MODELS = ('delay', 'platform', 'drive_mode')
+
+def random_rows(n, seed=0):
+    """Feature rows on and off the simulation's grid, including fractional values."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 24, n), rng.integers(0, 7, n), rng.integers(0, 12, n), rng.integers(0, 12, n),
+        rng.choice([0, 5, 10, 15, 7.5, 30], n), rng.integers(1, 3, n), rng.integers(0, 2, n), rng.integers(0, 2, n),
+    ]).astype(float) + rng.choice([0, 0, 0.5, -0.25], (n, len(FEATURES)))
+
+@pytest.mark.parametrize('name', MODELS)
+@pytest.mark.parametrize('rows', ['grid', 'random'])
+def test_predict_matches_pipeline(ai_manager, name, rows):
+    pipeline = getattr(ai_manager, f'{name}_model')
+    X = DecisionTable.grid(3) if rows == 'grid' else random_rows(5000)
+    expected = pipeline.predict(X)
+    np.testing.assert_array_equal(CompiledForest.from_pipeline(pipeline).predict(X), expected)
+
+@pytest.mark.parametrize('name', MODELS)
+def test_save_and_load(ai_manager, tmp_path, name):
+    forest = CompiledForest.from_pipeline(getattr(ai_manager, f'{name}_model'))
+    meta = forest.save(str(tmp_path), name)
+    loaded = CompiledForest.load(str(tmp_path), name, meta)
+    X = random_rows(500, seed=1)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
\ No newline at end of file
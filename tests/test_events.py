@@ -0,0 +1,61 @@
+"""EventLog: recorded rows come back unchanged from to_frame."""
+import numpy as np
+import pandas as pd
+from simulation.events import EventLog, EVENT_CODES, ANY_PLATFORM
+
+STATIONS, BLOCKS = ['A', 'B', 'C'], ['A-B', 'B-C']
+
+def journey(train):
+    """One train's events as (time, event, payload, details)."""
+    t = 10.0 * train
+    return [
+        (t, 'start_delayed', {'value': 2.5}, "Starts with 2.5 min delay"),
+        (t + 2.5, 'depart', {'station': 0, 'value': 110}, "Departed from Station A"),
+        (t + 2.5, 'travel_start', {'block': 0}, "Traveling on A-B"),
+        (t + 62.5, 'travel_end', {'block': 0}, "Finished travel on A-B"),
+        (t + 62.5, 'arrive_station', {'station': 1}, "Arrived at vicinity of Station B"),
+        (t + 63, 'at_platform', {'station': 1, 'platform': 2 if train % 2 else ANY_PLATFORM},
+         "Docked at Station B Platform 2" if train % 2 else "Docked at Station B Platform Any"),
+        (t + 73, 'depart_station', {'station': 1}, "Departed from Station B"),
+        (t + 123.25, 'arrive_final', {'station': 2}, "Arrived at final destination Station C"),
+        (t + 123.25, 'final_energy', {'value': 548.5}, "Total energy consumed: 548 units"),
+    ]
+
+def recorded(n_trains, capacity=4):
+    log, expected = EventLog(STATIONS, BLOCKS, capacity=capacity), []
+    for train in range(n_trains):
+        index = log.add_train(f"T{train + 1:02d}")
+        for time, event, payload, details in journey(train):
+            log.record(time, index, EVENT_CODES[event], **payload)
+            expected.append({
+                'time': time, 'train_id': f"T{train + 1:02d}", 'event': event, 'details': details,
+                'block': BLOCKS[payload['block']] if 'block' in payload else np.nan,
+                'station': STATIONS[payload['station']] if 'station' in payload else np.nan,
+                'platform': payload.get('platform', -1), 'value': payload.get('value', np.nan)
+            })
+    return log, pd.DataFrame(expected)
+
+def plain(frame):
+    return frame.astype({column: object for column in ('train_id', 'event', 'details', 'block', 'station')})
+
+def test_to_frame_round_trip():
+    log, expected = recorded(5)
+    assert log.size == len(expected) > 4 # The columns grew past their initial capacity
+    pd.testing.assert_frame_equal(plain(log.to_frame()), expected, check_dtype=False)
+
+def test_to_frame_slice():
+    log, expected = recorded(3)
+    frame = log.to_frame(7, 20)
+    assert list(frame.index) == list(range(7, 20))
+    pd.testing.assert_frame_equal(plain(frame), expected.iloc[7:20], check_dtype=False)
+
+def test_released_trains_are_reused():
+    log, _ = recorded(3)
+    log.clear()
+    log.release_trains([1])
+    assert log.add_train('T99') == 1
+    assert log.add_train('T04') == 3
+    log.record(500.0, 1, EVENT_CODES['depart'], station=0, value=110)
+    frame = log.to_frame()
+    assert frame['train_id'].tolist() == ['T99']
+    assert frame['details'].tolist() == ["Departed from Station A"]
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""calculate_kpis and KPIAccumulator against a plain per-train loop over the log."""
+import pandas as pd
+import pytest
+from simulation.env import setup_simulation_environment, DAY
+from simulation.metrics import (calculate_kpis, KPIAccumulator, BASE_TRAVEL_TIME, STOP_ALLOWANCE,
+                                PUNCTUALITY_THRESHOLD, EMPTY_KPIS)
+
+HOURS = 24
+
+def reference_kpis(log_df, num_trains, simulation_duration_hours, num_platforms_b):
+    """The KPIs computed train by train, one filter of the log per train."""
+    if log_df.empty:
+        return dict(EMPTY_KPIS)
+    total_energy = sum(round(value) for value in log_df.loc[log_df['event'] == 'final_energy', 'value'])
+    end_time = log_df['time'].max()
+    duration_hours = end_time / 60 if end_time > 0 else simulation_duration_hours
+    throughput = round((log_df['event'] == 'arrive_final').sum() / duration_hours, 2)
+
+    train_ids = log_df['train_id'].unique()
+    total_delay, punctual_trains, delays, platform_time = 0, 0, [], 0
+    for train_id in train_ids:
+        rows = log_df[log_df['train_id'] == train_id]
+        depart = rows.loc[rows['event'] == 'depart', 'time'].min()
+        arrive = rows.loc[rows['event'] == 'arrive_final', 'time'].max()
+        stops = (rows['event'] == 'at_platform').sum()
+        if pd.notna(depart) and pd.notna(arrive):
+            scheduled = rows.loc[rows['event'] == 'depart', 'value'].iloc[0]
+            if pd.isna(scheduled):
+                scheduled = BASE_TRAVEL_TIME
+            delay = max(0, (arrive - depart) - (scheduled + STOP_ALLOWANCE * stops))
+            delays.append(delay)
+            total_delay += delay
+            punctual_trains += delay <= PUNCTUALITY_THRESHOLD
+
+        docked_at = None # Only completed platform stays count
+        for time, event in zip(rows['time'], rows['event']):
+            if event == 'at_platform':
+                docked_at = time
+            elif event == 'depart_station':
+                platform_time += time - docked_at
+
+    return {
+        "Punctuality": round(punctual_trains / num_trains * 100, 1),
+        "Average Delay": round(total_delay / len(train_ids), 1),
+        "Throughput": throughput,
+        "Platform B Utilization": round(platform_time / (duration_hours * 60 * num_platforms_b) * 100, 1),
+        "Total Energy": total_energy,
+        "Max Delay": round(max(delays), 1) if delays else 0
+    }
+
+def make_config(seed, is_ai_controlled, ai_manager):
+    return {
+        'num_trains': 20, 'platforms_a': 2, 'platforms_b': 2, 'platforms_c': 2,
+        'travel_time_ab': 60, 'travel_time_bc': 50, 'disaster_mode': False,
+        'what_if_train': 'T05', 'what_if_delay': 25, 'seed': seed,
+        'is_ai_controlled': is_ai_controlled, 'ai_manager': ai_manager if is_ai_controlled else None,
+    }
+
+def checkpoints(config):
+    """Steps a run to the end and yields its environment every two simulated hours."""
+    env, _ = setup_simulation_environment(config, None)
+    for until in range(120, DAY + 120, 120):
+        while not env.fleet.processed and env.peek() < until:
+            env.step()
+        yield env
+
+@pytest.mark.parametrize('is_ai_controlled', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_calculate_kpis_matches_reference(ai_manager, seed, is_ai_controlled):
+    config = make_config(seed, is_ai_controlled, ai_manager)
+    for env in checkpoints(config):
+        log_df = env.event_log.to_frame()
+        args = (log_df, config['num_trains'], HOURS, config['platforms_b'])
+        assert calculate_kpis(*args) == reference_kpis(*args)
+
+@pytest.mark.parametrize('is_ai_controlled', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_accumulator_matches_reference(ai_manager, seed, is_ai_controlled):
+    config = make_config(seed, is_ai_controlled, ai_manager)
+    accumulator = KPIAccumulator(config['num_trains'], HOURS, config['platforms_b'])
+    for env in checkpoints(config):
+        accumulator.update(env.event_log)
+        log_df = env.event_log.to_frame()
+        assert accumulator.kpis() == reference_kpis(log_df, config['num_trains'], HOURS, config['platforms_b'])
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""AIManager's artifact cache: models are trained once per CSV and loaded from disk after."""
+import os
+import shutil
+import numpy as np
+import pytest
+from ai.lookup import DecisionTable
+from ai.model import AIManager
+
+HISTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'historical.csv')
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / 'historical.csv'
+    shutil.copy(HISTORY, path)
+    return str(path)
+
+def predictions(manager, X):
+    return manager.predict_delay_batch(X), manager.predict_platform_batch(X), manager.predict_drive_mode_batch(X)
+
+def test_second_manager_loads_instead_of_training(monkeypatch, data_path):
+    trained = AIManager(data_path)
+    trained.load_or_train(n_jobs=1)
+
+    monkeypatch.setattr(AIManager, 'train_models', lambda *args, **kwargs: pytest.fail("retrained on a cache hit"))
+    loaded = AIManager(data_path)
+    loaded.load_or_train()
+    assert loaded.artifact_dir == trained.artifact_dir
+    X = DecisionTable.grid(2)
+    for expected, actual in zip(predictions(trained, X), predictions(loaded, X)):
+        np.testing.assert_array_equal(actual, expected)
+
+def test_changed_csv_is_a_miss(data_path):
+    first = AIManager(data_path)
+    first.load_or_train(n_jobs=1)
+    with open(data_path) as f:
+        lines = f.readlines()
+    with open(data_path, 'w') as f:
+        f.writelines(lines[:-1]) # Not an append, so the models are trained from scratch
+
+    second = AIManager(data_path)
+    second.load_or_train(n_jobs=1)
+    assert second.is_trained and second.artifact_dir != first.artifact_dir
+    assert os.path.exists(os.path.join(first.artifact_dir, 'meta.json'))
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""Seeded runs in the process pool give the same results as in this process."""
+import pandas as pd
+from simulation.env import run_simulation
+from simulation.metrics import calculate_kpis
+from simulation.parallel import run_simulations_parallel
+from simulation.replications import run_replications, replication_seeds, CONTROLLERS
+
+CONFIG = {'num_trains': 15, 'platforms_a': 2, 'platforms_b': 3, 'platforms_c': 2, 'disaster_mode': False,
+          'what_if_train': 'T05', 'what_if_delay': 25}
+
+def in_process(config, manager):
+    config = {**config, 'ai_manager': manager if config['is_ai_controlled'] else None}
+    log_df, alerts, controller = run_simulation(config)
+    return log_df, alerts, getattr(controller, 'decision_logs', [])
+
+def test_run_simulations_parallel_matches_in_process(cached_ai_manager):
+    configs = {name: {**CONFIG, 'is_ai_controlled': is_ai, 'seed': 11} for name, is_ai in CONTROLLERS.items()}
+    results = run_simulations_parallel(configs, ai_manager=cached_ai_manager, max_workers=2)
+    assert results.keys() == configs.keys()
+    for name, config in configs.items():
+        log_df, alerts, decision_logs = results[name]
+        expected_log, expected_alerts, expected_decisions = in_process(config, cached_ai_manager)
+        pd.testing.assert_frame_equal(log_df, expected_log)
+        assert alerts == expected_alerts
+        assert decision_logs == expected_decisions
+
+def test_replications_match_in_process(cached_ai_manager):
+    results = run_replications(CONFIG, 2, base_seed=5, ai_manager=cached_ai_manager, max_workers=2)
+    assert results['seed'].tolist() == [seed for seed in replication_seeds(5, 2) for _ in CONTROLLERS]
+    for row in results.to_dict('records'):
+        config = {**CONFIG, 'is_ai_controlled': CONTROLLERS[row['controller']], 'seed': row['seed']}
+        kpis = calculate_kpis(in_process(config, cached_ai_manager)[0], CONFIG['num_trains'], 24, CONFIG['platforms_b'])
+        assert {k: row[k] for k in kpis} == {k: float(v) for k, v in kpis.items()}
\ No newline at end of file
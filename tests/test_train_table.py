@@ -0,0 +1,41 @@
+"""TrainTable rows: growth, and reuse of finished trains' rows over a long run."""
+import numpy as np
+import simulation.horizon as horizon
+from simulation.train import TrainTable
+
+def test_grows_past_capacity():
+    table = TrainTable(['route'], capacity=2)
+    for n in range(5):
+        assert table.add(f"T{n}", 0, stop_duration=5 * n, initial_delay=n / 2) == n
+    assert len(table) == 5 and len(table.route) >= 5
+    frame = table.to_frame()
+    assert frame['train_id'].tolist() == ['T0', 'T1', 'T2', 'T3', 'T4']
+    assert frame['priority'].tolist() == [1, 2, 2, 2, 2] # Express only without stops
+    np.testing.assert_array_equal(frame['initial_delay'], [0, 0.5, 1, 1.5, 2])
+
+def test_release_reuses_rows_only_when_recycling():
+    for recycle, expected in ((True, 1), (False, 3)):
+        table = TrainTable(['route'], capacity=4, recycle=recycle)
+        for n in range(3):
+            table.add(f"T{n}", 0, stop_duration=10)
+        table.release(1)
+        assert table.add("T3", 0, stop_duration=0, initial_delay=7) == expected
+        assert table.train_ids[expected] == "T3" and table.priority[expected] == 1 and table.initial_delay[expected] == 7
+
+def test_long_run_keeps_one_days_rows(monkeypatch):
+    environments = []
+    def setup(*args, **kwargs):
+        env, controller = setup_simulation_environment(*args, **kwargs)
+        environments.append(env)
+        return env, controller
+    setup_simulation_environment = horizon.setup_simulation_environment
+    monkeypatch.setattr(horizon, 'setup_simulation_environment', setup)
+
+    config = {
+        'num_trains': 10, 'platforms_a': 2, 'platforms_b': 2, 'platforms_c': 2, 'disaster_mode': False,
+        'what_if_train': None, 'what_if_delay': 0, 'is_ai_controlled': False, 'seed': 1, 'days': 5,
+    }
+    windows = horizon.run_long_simulation(config)[0]
+    assert windows['Arrivals'].tolist() == [10] * 5
+    trains = environments[0].trains
+    assert len(trains) == 10 and len(trains.route) == 10 # 50 trains in 10 rows, never grown
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""Train.travel_segment against the per-minute model it replaces: same arrivals, same energy."""
+import pytest
+from simulation.env import run_simulation
+from simulation.metrics import calculate_kpis
+from simulation.train import Train, ENERGY_RATES
+
+def per_minute_travel_segment(self, block, total_travel_time):
+    """The reference model: one Timeout and one drive-mode decision per minute of travel."""
+    self._add_log("travel_start", block=block)
+    block_request = self.controller.request_block(self.train_id, block)
+    yield block_request
+
+    time_traveled = 0
+    while time_traveled < total_travel_time:
+        self.drive_mode = self.controller.get_drive_mode(self)
+        self.energy_consumed += ENERGY_RATES.get(self.drive_mode, 0)
+        if self.drive_mode == "Eco-Coast":
+            total_travel_time += 0.25
+        yield self.env.timeout(1)
+        time_traveled += 1
+
+    self.controller.release_block(block, block_request)
+    self._add_log("travel_end", block=block)
+
+def outcome(config):
+    log_df = run_simulation(config)[0]
+    arrivals = log_df[log_df['event'] == 'arrive_final'].set_index('train_id')['time'].to_dict()
+    kpis = calculate_kpis(log_df, config['num_trains'], 24, config['platforms_b'])
+    return arrivals, kpis['Total Energy']
+
+@pytest.mark.parametrize('is_ai_controlled', [False, True])
+@pytest.mark.parametrize('num_trains', [15, 30])
+@pytest.mark.parametrize('seed', range(6))
+def test_matches_per_minute_model(monkeypatch, ai_manager, is_ai_controlled, num_trains, seed):
+    config = {
+        'num_trains': num_trains, 'platforms_a': 2, 'platforms_b': 3, 'platforms_c': 2,
+        'travel_time_ab': 60, 'travel_time_bc': 50, 'disaster_mode': False,
+        'what_if_train': 'T05', 'what_if_delay': 25, 'seed': seed,
+        'is_ai_controlled': is_ai_controlled, 'ai_manager': ai_manager if is_ai_controlled else None,
+    }
+    expected = outcome(config)
+    monkeypatch.setattr(Train, 'travel_segment', per_minute_travel_segment)
+    assert outcome(config) == expected
\ No newline at end of file